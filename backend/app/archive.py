@@ -0,0 +1,102 @@
+# archive.py
+# Moves returned borrow logs older than BORROW_ARCHIVE_AFTER_DAYS (default 180)
+# from borrow_logs to borrow_logs_archive.
+#
+#   python -m app.archive [--older-than-days N] [--batch-size N]
+#
+# The API also runs it daily (scheduler.py, started by main.py unless
+# RUN_SCHEDULER=false). Archived logs still show up in borrow log lists, the
+# borrowed report and usage backfills.
+import argparse
+import time
+from sqlalchemy import text
+from .database import engine, SessionLocal, add_missing_columns
+from . import models, crud, change_feed
+
+BORROW_LOGS = models.BorrowLog.__tablename__
+BORROW_LOGS_ARCHIVE = models.BorrowLogArchive.__tablename__
+
+def setup_borrow_log_ids(engine):
+    """Rebuild borrow_logs with AUTOINCREMENT if it was created without it.
+
+    Without it SQLite hands out max(id) + 1, which reuses the ids of archived
+    logs once the newest live log is deleted. Live logs that already took an
+    archived log's id are given new ids."""
+    if engine.dialect.name != "sqlite":
+        return
+    columns = ", ".join(column.name for column in models.BorrowLog.__table__.columns)
+
+    with engine.connect() as conn:
+        # Table rebuilds are done with foreign keys off, and the pragma can't
+        # change inside a transaction
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        try:
+            # Taken before the check so concurrent workers migrate once
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            table_sql = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": BORROW_LOGS}
+            ).scalar()
+            if table_sql is None or "AUTOINCREMENT" in table_sql.upper():
+                conn.rollback()
+                return
+
+            triggers = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :name"), {"name": BORROW_LOGS}
+            ).scalars().all()
+            indexes = conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"),
+                {"name": BORROW_LOGS}
+            ).scalars().all()
+            conn.exec_driver_sql(f"ALTER TABLE {BORROW_LOGS} RENAME TO {BORROW_LOGS}_old")
+            for index in indexes:
+                conn.exec_driver_sql(f"DROP INDEX {index}")
+            models.BorrowLog.__table__.create(bind=conn)
+            conn.exec_driver_sql(f"INSERT INTO {BORROW_LOGS} ({columns}) SELECT {columns} FROM {BORROW_LOGS}_old")
+            # Also drops the old table's triggers, which are then recreated
+            conn.exec_driver_sql(f"DROP TABLE {BORROW_LOGS}_old")
+            for trigger in triggers:
+                conn.exec_driver_sql(trigger)
+
+            high = conn.execute(text(
+                f"SELECT max(coalesce((SELECT max(id) FROM {BORROW_LOGS}), 0), coalesce((SELECT max(id) FROM {BORROW_LOGS_ARCHIVE}), 0))"
+            )).scalar()
+            reused = conn.execute(text(
+                f"SELECT id FROM {BORROW_LOGS} WHERE id IN (SELECT id FROM {BORROW_LOGS_ARCHIVE}) ORDER BY id"
+            )).scalars().all()
+            for old_id in reused:
+                high += 1
+                conn.execute(text(f"UPDATE {BORROW_LOGS} SET id = :new_id WHERE id = :old_id"), {"new_id": high, "old_id": old_id})
+            # The update trigger reports the live logs' new ids; sync clients
+            # also need the archived logs back under the ids they keep
+            if reused and change_feed.feed_installed(conn):
+                change_feed.record_changes(conn, "borrow_log", BORROW_LOGS_ARCHIVE, reused, "user_id")
+            conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": BORROW_LOGS})
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": BORROW_LOGS, "seq": high})
+            conn.commit()
+            if reused:
+                print(f"⚠️ Gave new ids to {len(reused)} borrow logs that had reused archived ids")
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old returned borrow logs")
+    parser.add_argument("--older-than-days", type=int, default=crud.BORROW_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=crud.BORROW_ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    models.BorrowLogArchive.__table__.create(bind=engine, checkfirst=True)
+    add_missing_columns(engine, models.Base.metadata)
+    setup_borrow_log_ids(engine)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        moved = crud.archive_borrow_logs(db, older_than_days=args.older_than_days, batch_size=args.batch_size)
+        print(f"Archived {moved} borrow logs in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
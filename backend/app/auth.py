@@ -1,12 +1,17 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from .database import get_db
-from . import crud, schemas
+from .database import get_read_db
+from . import crud, crud_async, schemas
+from .utils.cache import TTLCache
 
 # Security configuration
 SECRET_KEY = "your-secret-key-here"  # Change this in production
@@ -16,17 +21,48 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# bcrypt is deliberately slow, so hashing runs on a small dedicated pool: async
+# routes await it instead of blocking the event loop, and a burst of logins
+# can only occupy PASSWORD_HASH_WORKERS threads at a time
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_executor.submit(pwd_context.verify, plain_password, hashed_password).result()
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_executor.submit(pwd_context.hash, password).result()
+
+async def verify_password_async(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.verify, plain_password, hashed_password)
+
+# Decoded tokens (token -> user_id) and the users they resolve to are cached
+# in-process, so most authenticated requests never touch the users table.
+# crud.update_user/delete_user drop a user's entry when it changes.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAXSIZE = int(os.getenv("AUTH_CACHE_MAXSIZE", "1024"))
+token_cache = TTLCache(maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+user_cache = TTLCache(maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL_SECONDS)
 
-def authenticate_user(db: Session, username: str, password: str):
+def invalidate_cached_user(user_id: int):
+    user_cache.pop(user_id)
+
+def get_auth_cache_stats():
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+async def authenticate_user_async(db: Session, username: str, password: str):
     user = crud.get_user_by_username(db, username)
     if not user:
         return False
-    if not verify_password(password, user.password_hash):
+    # Hand the pooled connection back before waiting on bcrypt; otherwise a
+    # login storm holds every connection and the next checkout blocks the loop.
+    # The loaded user stays readable after close().
+    db.close()
+    if not await verify_password_async(password, user.password_hash):
         return False
     return user
 
@@ -42,26 +78,41 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        user_id: int = payload.get("user_id")
-        if username is None or user_id is None:
+    token = credentials.credentials
+    user_id = token_cache.get(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get("sub")
+            user_id: int = payload.get("user_id")
+            if username is None or user_id is None:
+                raise credentials_exception
+            token_data = schemas.TokenData(username=username, user_id=user_id)
+        except JWTError:
             raise credentials_exception
-        token_data = schemas.TokenData(username=username, user_id=user_id)
-    except JWTError:
-        raise credentials_exception
+        
+        # Never serve a token from cache past its own expiry
+        ttl = AUTH_CACHE_TTL_SECONDS
+        if payload.get("exp"):
+            ttl = min(ttl, payload["exp"] - time.time())
+        token_cache.set(token, token_data.user_id, ttl=ttl)
+        user_id = token_data.user_id
     
-    user = crud.get_user(db, user_id=token_data.user_id)
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        user = await crud_async.get_user(db, user_id=user_id)
+        if user is None:
+            raise credentials_exception
+        # Detach it so the cached instance can outlive this request's session
+        db.expunge(user)
+        user_cache.set(user_id, user)
     return user
 
 async def get_current_admin(current_user: schemas.User = Depends(get_current_user)):
@@ -0,0 +1,113 @@
+# change_feed.py
+# Change sequence behind GET /api/sync: every insert, update and delete of an
+# item, category or borrow log moves that row's sync_changes entry to the next
+# seq. Triggers write it, so bulk statements, cascaded deletes and the archive
+# move are covered the same way as the ORM.
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from . import models
+
+CHANGES_TABLE = models.SyncChange.__tablename__
+
+def _touch(entity: str, row: str, deleted: bool, user_column: str = None) -> str:
+    user_id = f"{row}.{user_column}" if user_column else "NULL"
+    return f"""INSERT INTO {CHANGES_TABLE}(entity, entity_id, seq, deleted, user_id)
+        VALUES ('{entity}', {row}.id, (SELECT coalesce(max(seq), 0) + 1 FROM {CHANGES_TABLE}), {int(deleted)}, {user_id})
+        ON CONFLICT(entity, entity_id) DO UPDATE SET
+            seq = excluded.seq, deleted = excluded.deleted, user_id = excluded.user_id;"""
+
+def _insert_trigger(table: str, entity: str, user_column: str = None) -> str:
+    return f"""CREATE TRIGGER IF NOT EXISTS {table}_change_ai AFTER INSERT ON {table} BEGIN
+        {_touch(entity, "new", False, user_column)}
+    END"""
+
+def _update_trigger(table: str, entity: str, user_column: str = None) -> str:
+    return f"""CREATE TRIGGER IF NOT EXISTS {table}_change_au AFTER UPDATE ON {table} BEGIN
+        {_touch(entity, "new", False, user_column)}
+    END"""
+
+def _delete_trigger(table: str, entity: str, user_column: str = None, when: str = "") -> str:
+    return f"""CREATE TRIGGER IF NOT EXISTS {table}_change_ad AFTER DELETE ON {table} {when} BEGIN
+        {_touch(entity, "old", True, user_column)}
+    END"""
+
+ITEMS = models.Item.__tablename__
+CATEGORIES = models.Category.__tablename__
+BORROW_LOGS = models.BorrowLog.__tablename__
+BORROW_LOGS_ARCHIVE = models.BorrowLogArchive.__tablename__
+
+CHANGE_TRIGGERS = [
+    _insert_trigger(ITEMS, "item"),
+    _update_trigger(ITEMS, "item"),
+    _delete_trigger(ITEMS, "item"),
+    _insert_trigger(CATEGORIES, "category"),
+    _update_trigger(CATEGORIES, "category"),
+    _delete_trigger(CATEGORIES, "category"),
+    _insert_trigger(BORROW_LOGS, "borrow_log", "user_id"),
+    _update_trigger(BORROW_LOGS, "borrow_log", "user_id"),
+    # Archiving copies a log to the archive before deleting it, so that delete
+    # is a move (the log's archived flag changes) rather than a tombstone.
+    # This relies on ids never being reused, see archive.setup_borrow_log_ids.
+    _delete_trigger(
+        BORROW_LOGS, "borrow_log", "user_id",
+        when=f"WHEN NOT EXISTS (SELECT 1 FROM {BORROW_LOGS_ARCHIVE} WHERE id = old.id)"
+    ),
+    _insert_trigger(BORROW_LOGS_ARCHIVE, "borrow_log", "user_id"),
+    _delete_trigger(BORROW_LOGS_ARCHIVE, "borrow_log", "user_id"),
+]
+
+# Rows written before the triggers existed; seq = offset + id keeps seqs
+# distinct without numbering rows one by one (live and archived borrow logs
+# never share an id: borrow_logs is AUTOINCREMENT, see archive.py)
+BACKFILL_SOURCES = {
+    "category": f"SELECT id, NULL AS user_id FROM {CATEGORIES}",
+    "item": f"SELECT id, NULL AS user_id FROM {ITEMS}",
+    "borrow_log": f"SELECT id, user_id FROM {BORROW_LOGS} UNION ALL SELECT id, user_id FROM {BORROW_LOGS_ARCHIVE}",
+}
+
+def feed_installed(conn) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'items_change_ai'")
+    ).first() is not None
+
+def record_changes(conn, entity: str, table: str, ids, user_column: str = None):
+    """Move the given rows of table to the next seq, for writes the triggers
+    don't see (e.g. a row that now owns an id another row had before)"""
+    user_id = user_column or "NULL"
+    for entity_id in ids:
+        conn.execute(text(
+            f"""INSERT INTO {CHANGES_TABLE}(entity, entity_id, seq, deleted, user_id)
+                SELECT '{entity}', id, (SELECT coalesce(max(seq), 0) + 1 FROM {CHANGES_TABLE}), 0, {user_id}
+                FROM {table} WHERE id = :id
+                ON CONFLICT(entity, entity_id) DO UPDATE SET
+                    seq = excluded.seq, deleted = excluded.deleted, user_id = excluded.user_id"""
+        ), {"id": entity_id})
+
+# Set by setup_change_feed(); /api/sync answers 501 while this is False
+feed_enabled = False
+
+def setup_change_feed(engine):
+    """Create the change triggers if missing, recording existing rows once"""
+    global feed_enabled
+    if engine.dialect.name != "sqlite":
+        feed_enabled = False
+        return feed_enabled
+
+    try:
+        with engine.begin() as conn:
+            exists = feed_installed(conn)
+            for statement in CHANGE_TRIGGERS:
+                conn.execute(text(statement))
+            if not exists:
+                for entity, source in BACKFILL_SOURCES.items():
+                    offset = conn.execute(text(f"SELECT coalesce(max(seq), 0) FROM {CHANGES_TABLE}")).scalar()
+                    conn.execute(text(
+                        f"""INSERT INTO {CHANGES_TABLE}(entity, entity_id, seq, deleted, user_id)
+                            SELECT '{entity}', id, :offset + id, 0, user_id FROM ({source})"""
+                    ), {"offset": offset})
+        feed_enabled = True
+    except OperationalError as e:
+        # SQLite older than 3.24 has no upsert
+        print(f"⚠️ Change feed unavailable: {e}")
+        feed_enabled = False
+    return feed_enabled
@@ -1,19 +1,45 @@
 #crud.py
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, and_, or_, case, select, literal, literal_column, insert, update, delete, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from pydantic import ValidationError
 from . import models, schemas
-from .auth import get_password_hash
+from . import search as search_module
+from .auth import get_password_hash, invalidate_cached_user
 from typing import List, Optional
-from datetime import datetime
-from passlib.context import CryptContext
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-# User CRUD operations
-def get_password_hash(password):
-    return pwd_context.hash(password)
+from datetime import date, datetime, timedelta
+import base64
+import json
+import os
+import threading
+import time
+
+# Keyset pagination - list queries are ordered by id and resume after the last
+# id seen, so every page costs the same no matter how deep it is
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+def next_cursor(results, limit: int) -> Optional[str]:
+    # A short page means there is nothing left to fetch
+    if limit and len(results) == limit:
+        return encode_cursor(results[-1].id)
+    return None
 
 # User CRUD operations
+def user_statement(user_id: int):
+    return select(models.User).where(models.User.id == user_id)
+
 def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.scalars(user_statement(user_id)).first()
 
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
@@ -21,8 +47,11 @@ def get_user_by_username(db: Session, username: str):
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    query = db.query(models.User)
+    if after_id is not None:
+        query = query.filter(models.User.id > after_id)
+    return query.order_by(models.User.id).offset(skip).limit(limit).all()
 
 def create_user(db: Session, user: schemas.UserCreate):
     hashed_password = get_password_hash(user.password)
@@ -40,6 +69,7 @@ def create_user(db: Session, user: schemas.UserCreate):
     )
     db.add(db_user)
     db.commit()
+    invalidate_dashboard_stats()
     db.refresh(db_user)
     return db_user
 
@@ -56,14 +86,34 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
             setattr(db_user, field, value)
         
         db.commit()
+        invalidate_cached_user(user_id)
         db.refresh(db_user)
     return db_user
 
+# Users and categories are deleted with the database's ON DELETE CASCADE rather
+# than by loading their children. Borrow logs (live and archived) go first in
+# one set-based DELETE each: SQLite cascades parent row by parent row, which is
+# several times slower for the logs of thousands of items.
+def _delete_borrow_logs(db: Session, conditions):
+    """conditions(model) gives the filter for models.BorrowLog and models.BorrowLogArchive"""
+    for model in (models.BorrowLog, models.BorrowLogArchive):
+        db.execute(
+            delete(model).where(or_(*conditions(model))).execution_options(synchronize_session=False)
+        )
+
 def delete_user(db: Session, user_id: int):
     db_user = get_user(db, user_id)
     if db_user:
+        created_items = select(models.Item.id).where(models.Item.created_by == user_id)
+        _delete_borrow_logs(db, lambda log: (
+            log.user_id == user_id,
+            log.admin_id == user_id,
+            log.item_id.in_(created_items),
+        ))
         db.delete(db_user)
         db.commit()
+        invalidate_dashboard_stats()
+        invalidate_cached_user(user_id)
         return True
     return False
 # Category CRUD operations
@@ -74,13 +124,15 @@ def get_category_by_name(db: Session, name: str):
     return db.query(models.Category).filter(models.Category.name == name).first()
 
 def get_categories(db: Session, skip: int = 0, limit: int = 100):
-    categories = db.query(models.Category).offset(skip).limit(limit).all()
+    # Count items per category in the same grouped query instead of one COUNT per row
+    rows = db.query(models.Category, func.count(models.Item.id)).outerjoin(
+        models.Item, models.Item.category_id == models.Category.id
+    ).group_by(models.Category.id).order_by(models.Category.id).offset(skip).limit(limit).all()
     
-    # Add items count to each category
-    for category in categories:
-        category.items_count = db.query(models.Item).filter(
-            models.Item.category_id == category.id
-        ).count()
+    categories = []
+    for category, items_count in rows:
+        category.items_count = items_count
+        categories.append(category)
     
     return categories
 
@@ -88,6 +140,7 @@ def create_category(db: Session, category: schemas.CategoryCreate):
     db_category = models.Category(**category.dict())
     db.add(db_category)
     db.commit()
+    invalidate_dashboard_stats()
     db.refresh(db_category)
     return db_category
 
@@ -104,16 +157,45 @@ def update_category(db: Session, category_id: int, category_update: schemas.Cate
 def delete_category(db: Session, category_id: int):
     db_category = get_category(db, category_id)
     if db_category:
+        category_items = select(models.Item.id).where(models.Item.category_id == category_id)
+        _delete_borrow_logs(db, lambda log: (log.item_id.in_(category_items),))
         db.delete(db_category)
         db.commit()
+        invalidate_dashboard_stats()
     return db_category
 
+# Relationships serialized by schemas.ItemWithDetails and schemas.BorrowLogWithDetails.
+# Loading them up front keeps list endpoints at one query per page instead of
+# one extra SELECT per row and relationship.
+ITEM_DETAIL_OPTIONS = (
+    joinedload(models.Item.category),
+    joinedload(models.Item.created_by_user),
+    joinedload(models.Item.forecast),
+)
+
+# Projected days until available stock runs out at the forecast usage rate;
+# NULL for items that aren't being used up or haven't been forecast yet
+DAYS_UNTIL_STOCKOUT = models.Item.available_quantity / func.nullif(models.ItemForecast.daily_rate, 0)
+ITEM_SORTS = ("stockout",)
+
+BORROW_LOG_DETAIL_OPTIONS = (
+    joinedload(models.BorrowLog.item),
+    joinedload(models.BorrowLog.user),
+    joinedload(models.BorrowLog.admin),
+)
+ARCHIVED_BORROW_LOG_DETAIL_OPTIONS = (
+    joinedload(models.BorrowLogArchive.item),
+    joinedload(models.BorrowLogArchive.user),
+    joinedload(models.BorrowLogArchive.admin),
+)
+
 # Item CRUD operations
 def get_item(db: Session, item_id: int):
     return db.query(models.Item).filter(models.Item.id == item_id).first()
 
-def get_items(
-    db: Session, 
+# The hot list/stat reads are built as select() statements so the sync
+# functions here and their crud_async counterparts share one definition
+def items_statement(
     skip: int = 0, 
     limit: int = 100,
     search: Optional[str] = None,
@@ -121,18 +203,23 @@ def get_items(
     storage_location: Optional[str] = None,
     condition: Optional[str] = None,
     low_stock: Optional[bool] = None,
-    borrowable_only: Optional[bool] = None
+    borrowable_only: Optional[bool] = None,
+    after_id: Optional[int] = None,
+    expires_within_days: Optional[int] = None,
+    stockout_within_days: Optional[float] = None,
+    below_reorder_point: Optional[bool] = None,
+    sort: Optional[str] = None,
+    ranked: bool = False
 ):
-    query = db.query(models.Item)
+    query = select(models.Item).options(*ITEM_DETAIL_OPTIONS)
+    id_column = models.Item.id
     
     # Apply filters
     if search:
-        query = query.filter(
-            or_(
-                models.Item.name.ilike(f"%{search}%"),
-                models.Item.description.ilike(f"%{search}%")
-            )
-        )
+        query, id_column = search_module.apply_item_search(query, search, ranked=ranked)
+    
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
     
     if category_id:
         query = query.filter(models.Item.category_id == category_id)
@@ -149,7 +236,68 @@ def get_items(
     if borrowable_only:
         query = query.filter(models.Item.is_borrowable == True)
     
-    return query.offset(skip).limit(limit).all()
+    if expires_within_days is not None:
+        query = query.filter(*expiring_window(expires_within_days))
+    
+    # Forecast filters and sorting (see forecasting.py)
+    if stockout_within_days is not None or below_reorder_point or sort == "stockout":
+        query = query.outerjoin(models.ItemForecast, models.ItemForecast.item_id == models.Item.id)
+    
+    if stockout_within_days is not None:
+        query = query.filter(DAYS_UNTIL_STOCKOUT <= stockout_within_days)
+    
+    if below_reorder_point:
+        query = query.filter(
+            models.ItemForecast.daily_rate > 0,
+            models.Item.available_quantity <= models.ItemForecast.reorder_point
+        )
+    
+    if sort == "stockout":
+        # Soonest stockout first, items not running out last
+        return query.order_by(DAYS_UNTIL_STOCKOUT.asc().nulls_last(), id_column).offset(skip).limit(limit)
+    
+    return query.order_by(id_column).offset(skip).limit(limit)
+
+def get_items(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100,
+    search: Optional[str] = None,
+    category_id: Optional[int] = None,
+    storage_location: Optional[str] = None,
+    condition: Optional[str] = None,
+    low_stock: Optional[bool] = None,
+    borrowable_only: Optional[bool] = None,
+    after_id: Optional[int] = None,
+    expires_within_days: Optional[int] = None,
+    stockout_within_days: Optional[float] = None,
+    below_reorder_point: Optional[bool] = None,
+    sort: Optional[str] = None
+):
+    # Relevance ranking only applies to unsorted offset pages; cursor pages follow id order
+    ranked = False
+    if search and after_id is None and not sort:
+        count_statement = search_module.match_count_statement(search)
+        ranked = count_statement is not None and search_module.within_ranking_limit(
+            db.execute(count_statement).scalar()
+        )
+    
+    return db.scalars(items_statement(
+        skip=skip,
+        limit=limit,
+        search=search,
+        category_id=category_id,
+        storage_location=storage_location,
+        condition=condition,
+        low_stock=low_stock,
+        borrowable_only=borrowable_only,
+        after_id=after_id,
+        expires_within_days=expires_within_days,
+        stockout_within_days=stockout_within_days,
+        below_reorder_point=below_reorder_point,
+        sort=sort,
+        ranked=ranked
+    )).all()
 
 def create_item(db: Session, item: schemas.ItemCreate):
     # Convert Pydantic model to dict
@@ -161,7 +309,13 @@ def create_item(db: Session, item: schemas.ItemCreate):
     # Create database item - image_url is now included in item_data
     db_item = models.Item(**item_data)
     db.add(db_item)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Foreign keys are enforced by the database
+        db.rollback()
+        raise ValueError("Category or creating user not found")
+    invalidate_dashboard_stats()
     db.refresh(db_item)
     return db_item
 
@@ -175,11 +329,20 @@ def update_item(db: Session, item_id: int, item_update: schemas.ItemUpdate):
             quantity_diff = update_data['quantity'] - db_item.quantity
             update_data['available_quantity'] = db_item.available_quantity + quantity_diff
         
+        # A condition set by hand replaces the one the expiry sweep would restore
+        if update_data.get('condition', db_item.condition) != db_item.condition:
+            update_data['condition_before_expiry'] = None
+        
         # Update fields
         for field, value in update_data.items():
             setattr(db_item, field, value)
         
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise ValueError("Category not found")
+        invalidate_dashboard_stats()
         db.refresh(db_item)
     return db_item
 
@@ -188,48 +351,427 @@ def delete_item(db: Session, item_id: int):
     if db_item:
         db.delete(db_item)
         db.commit()
+        invalidate_dashboard_stats()
     return db_item
 
+# Bulk import writes rows with one executemany INSERT and one commit per batch
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" if detail["loc"] else detail["msg"]
+        for detail in error.errors()
+    )
+
+def import_items(db: Session, rows, created_by: int, create_categories: bool = False):
+    """Create items from (row_number, data, error) tuples as produced by
+    utils.item_import.iter_import_rows. Invalid rows are reported and skipped;
+    valid rows are committed batch by batch."""
+    category_ids = {}
+    def load_categories():
+        category_ids.clear()
+        for category_id, name in db.execute(select(models.Category.id, models.Category.name)):
+            category_ids[name.casefold()] = category_id
+    load_categories()
+    known_ids = set(category_ids.values())
+    
+    result = {"created": 0, "failed": 0, "categories_created": 0, "errors": []}
+    batch, batch_rows, new_categories = [], [], 0
+    
+    def fail(row_number, message):
+        result["failed"] += 1
+        if len(result["errors"]) < IMPORT_MAX_ERRORS:
+            result["errors"].append({"row": row_number, "error": message})
+    
+    def flush():
+        nonlocal new_categories
+        if not batch and not new_categories:
+            return
+        try:
+            if batch:
+                db.execute(models.Item.__table__.insert(), batch)
+            db.commit()
+            result["created"] += len(batch)
+            result["categories_created"] += new_categories
+        except SQLAlchemyError as e:
+            db.rollback()
+            # Categories created in this batch were rolled back with it
+            load_categories()
+            known_ids.intersection_update(category_ids.values())
+            for row_number in batch_rows:
+                fail(row_number, f"Database error: {e.__class__.__name__}")
+        batch.clear()
+        batch_rows.clear()
+        new_categories = 0
+    
+    for row_number, data, error in rows:
+        if error:
+            fail(row_number, error)
+            continue
+        try:
+            row = schemas.ItemImportRow.model_validate(data)
+        except ValidationError as e:
+            fail(row_number, _validation_message(e))
+            continue
+        
+        if row.category_id is not None:
+            if row.category_id not in known_ids:
+                fail(row_number, f"Category id {row.category_id} not found")
+                continue
+            category_id = row.category_id
+        elif row.category:
+            category_id = category_ids.get(row.category.casefold())
+            if category_id is None:
+                if not create_categories:
+                    fail(row_number, f"Category '{row.category}' not found")
+                    continue
+                category_id = db.execute(
+                    models.Category.__table__.insert().values(name=row.category)
+                ).inserted_primary_key[0]
+                category_ids[row.category.casefold()] = category_id
+                known_ids.add(category_id)
+                new_categories += 1
+        else:
+            fail(row_number, "category or category_id is required")
+            continue
+        
+        item = row.model_dump(exclude={"category"})
+        item["category_id"] = category_id
+        item["available_quantity"] = item["quantity"]
+        item["created_by"] = created_by
+        batch.append(item)
+        batch_rows.append(row_number)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush()
+    flush()
+    
+    if result["created"] or result["categories_created"]:
+        invalidate_dashboard_stats()
+    return result
+
 # Borrow Log CRUD operations
-def get_borrow_log(db: Session, borrow_log_id: int):
-    return db.query(models.BorrowLog).filter(models.BorrowLog.id == borrow_log_id).first()
+def get_borrow_log(db: Session, borrow_log_id: int, include_archive: bool = False):
+    db_borrow_log = db.query(models.BorrowLog).filter(models.BorrowLog.id == borrow_log_id).first()
+    if db_borrow_log is None and include_archive:
+        # Archived logs are read-only, so only lookups for display pass this
+        db_borrow_log = db.get(models.BorrowLogArchive, borrow_log_id)
+    return db_borrow_log
 
-def get_borrow_logs(
-    db: Session,
+def borrow_logs_statement(
     skip: int = 0,
     limit: int = 100,
     user_id: Optional[int] = None,
     item_id: Optional[int] = None,
     status: Optional[str] = None,
-    overdue_only: Optional[bool] = None
+    overdue_only: Optional[bool] = None,
+    after_id: Optional[int] = None
+):
+    """Statement for a page of live borrow logs, or None if the filters can't match"""
+    conditions = borrow_log_conditions(
+        models.BorrowLog, user_id=user_id, item_id=item_id, status=status,
+        overdue_only=overdue_only, after_id=after_id
+    )
+    if conditions is None:
+        return None
+    query = select(models.BorrowLog).options(*BORROW_LOG_DETAIL_OPTIONS).where(*conditions)
+    return query.order_by(models.BorrowLog.id).offset(skip).limit(limit)
+
+# Borrow logs still out. update_overdue_borrows flips past-due BORROWED logs
+# to OVERDUE, so both count as out and overdue checks can't rely on status alone.
+OUT_STATUSES = (models.BorrowStatus.BORROWED, models.BorrowStatus.OVERDUE)
+
+def overdue_condition(model, now: Optional[datetime] = None):
+    return or_(
+        model.status == models.BorrowStatus.OVERDUE,
+        and_(
+            model.status == models.BorrowStatus.BORROWED,
+            model.expected_return_date < (now or datetime.now())
+        )
+    )
+
+def borrow_log_conditions(
+    model,
+    user_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+    status: Optional[str] = None,
+    overdue_only: Optional[bool] = None,
+    after_id: Optional[int] = None
 ):
-    query = db.query(models.BorrowLog)
+    """Filters for models.BorrowLog or models.BorrowLogArchive, or None if
+    they can't match"""
+    conditions = []
+    
+    if after_id is not None:
+        conditions.append(model.id > after_id)
     
     if user_id:
-        query = query.filter(models.BorrowLog.user_id == user_id)
+        conditions.append(model.user_id == user_id)
     
     if item_id:
-        query = query.filter(models.BorrowLog.item_id == item_id)
+        conditions.append(model.item_id == item_id)
     
     if status:
         # Convert string to uppercase to match enum values
         status_upper = status.upper()
         if hasattr(models.BorrowStatus, status_upper):
-            status_enum = getattr(models.BorrowStatus, status_upper)
-            query = query.filter(models.BorrowLog.status == status_enum)
+            conditions.append(model.status == getattr(models.BorrowStatus, status_upper))
         else:
             # If status validation fails, return empty results
-            return []
+            return None
     
     if overdue_only:
-        query = query.filter(
-            and_(
-                models.BorrowLog.status == models.BorrowStatus.BORROWED,
-                models.BorrowLog.expected_return_date < datetime.now()
+        conditions.append(overdue_condition(model))
+    
+    return conditions
+
+# Old returned logs live in borrow_logs_archive (see archive_borrow_logs). List
+# requests only look there when their filters can match a returned log and the
+# archive has ids past the cursor; pages then come from a UNION ALL of ids.
+def borrow_log_filters_reach_archive(status: Optional[str] = None, overdue_only: Optional[bool] = None) -> bool:
+    return not overdue_only and (not status or status.upper() == models.BorrowStatus.RETURNED.name)
+
+def archived_borrow_log_max_id_statement():
+    return select(func.max(models.BorrowLogArchive.id))
+
+def borrow_log_page_statement(skip: int = 0, limit: int = 100, **filters):
+    """(id, archived) for a page of borrow logs across both tables, in id order"""
+    branches = []
+    for model in (models.BorrowLog, models.BorrowLogArchive):
+        # Each side stops after skip + limit ids instead of sorting the union
+        branch = select(model.id.label("id"), literal(model.archived).label("archived")).where(
+            *borrow_log_conditions(model, **filters)
+        ).order_by(model.id).limit(skip + limit).subquery()
+        branches.append(select(branch.c.id, branch.c.archived))
+    page = union_all(*branches).subquery()
+    return select(page.c.id, page.c.archived).order_by(page.c.id).offset(skip).limit(limit)
+
+def borrow_log_rows_statement(model, ids):
+    options = ARCHIVED_BORROW_LOG_DETAIL_OPTIONS if model.archived else BORROW_LOG_DETAIL_OPTIONS
+    return select(model).options(*options).where(model.id.in_(ids))
+
+def order_borrow_log_page(page, live_logs, archived_logs):
+    by_key = {(False, log.id): log for log in live_logs}
+    by_key.update({(True, log.id): log for log in archived_logs})
+    return [by_key[(bool(archived), log_id)] for log_id, archived in page if (bool(archived), log_id) in by_key]
+
+def get_borrow_logs(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    user_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+    status: Optional[str] = None,
+    overdue_only: Optional[bool] = None,
+    after_id: Optional[int] = None
+):
+    statement = borrow_logs_statement(
+        skip=skip,
+        limit=limit,
+        user_id=user_id,
+        item_id=item_id,
+        status=status,
+        overdue_only=overdue_only,
+        after_id=after_id
+    )
+    if statement is None:
+        return []
+    
+    if borrow_log_filters_reach_archive(status, overdue_only):
+        archive_max_id = db.scalar(archived_borrow_log_max_id_statement())
+        if archive_max_id is not None and (after_id is None or archive_max_id > after_id):
+            page = db.execute(borrow_log_page_statement(
+                skip=skip, limit=limit, user_id=user_id, item_id=item_id,
+                status=status, overdue_only=overdue_only, after_id=after_id
+            )).all()
+            live_ids = [log_id for log_id, archived in page if not archived]
+            archived_ids = [log_id for log_id, archived in page if archived]
+            return order_borrow_log_page(
+                page,
+                db.scalars(borrow_log_rows_statement(models.BorrowLog, live_ids)).unique().all() if live_ids else [],
+                db.scalars(borrow_log_rows_statement(models.BorrowLogArchive, archived_ids)).unique().all() if archived_ids else []
             )
-        )
+    return db.scalars(statement).all()
+
+# Stock changes are applied as single conditional UPDATEs evaluated by the
+# database, so concurrent borrows can't both pass a stale Python-side check
+def reserve_stock(db: Session, item_id: int, quantity: int) -> bool:
+    """Take quantity out of available stock; False if not enough is left"""
+    reserved = db.query(models.Item).filter(
+        models.Item.id == item_id,
+        models.Item.available_quantity >= quantity
+    ).update(
+        {models.Item.available_quantity: models.Item.available_quantity - quantity},
+        synchronize_session=False
+    )
+    return reserved == 1
+
+def release_stock(db: Session, item_id: int, quantity: int):
+    """Put quantity back into available stock"""
+    db.query(models.Item).filter(models.Item.id == item_id).update(
+        {models.Item.available_quantity: models.Item.available_quantity + quantity},
+        synchronize_session=False
+    )
+
+def reserve_stock_batch(db: Session, quantities: dict) -> set:
+    """reserve_stock for many items ({item_id: quantity}) in one UPDATE;
+    returns the ids of the items that had enough left"""
+    needed = case(quantities, value=models.Item.id)
+    statement = update(models.Item).where(
+        models.Item.id.in_(quantities),
+        models.Item.available_quantity >= needed
+    ).values(
+        available_quantity=models.Item.available_quantity - needed
+    ).returning(models.Item.id).execution_options(synchronize_session=False)
+    return set(db.scalars(statement))
+
+def release_stock_batch(db: Session, quantities: dict):
+    """release_stock for many items ({item_id: quantity}) in one UPDATE"""
+    db.execute(update(models.Item).where(models.Item.id.in_(quantities)).values(
+        available_quantity=models.Item.available_quantity + case(quantities, value=models.Item.id)
+    ).execution_options(synchronize_session=False))
+
+# Daily usage rollups (models.BorrowDailyRollup) are updated in the same
+# transaction as the borrow log write, so usage reports never scan borrow_logs
+def _as_day(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+def record_borrow_usage(
+    db: Session,
+    day,
+    item_id: int,
+    status: models.BorrowStatus,
+    quantity: int,
+    category_id: Optional[int] = None,
+    sign: int = 1,
+    count: int = 1
+):
+    """Add (or with sign=-1 remove) `count` borrow or return events, totalling
+    `quantity`, to the rollup, under category_id or else the item's current
+    category"""
+    if category_id is None:
+        category_id = db.scalar(select(models.Item.category_id).where(models.Item.id == item_id))
+    rollup = models.BorrowDailyRollup
+    prefix = "returned" if status == models.BorrowStatus.RETURNED else "borrowed"
+    count_column, quantity_column = f"{prefix}_count", f"{prefix}_quantity"
     
-    return query.offset(skip).limit(limit).all()
+    statement = sqlite_insert(rollup).values(
+        day=_as_day(day),
+        item_id=item_id,
+        category_id=category_id,
+        **{count_column: sign * count, quantity_column: sign * quantity}
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[rollup.day, rollup.item_id, rollup.category_id],
+        set_={
+            count_column: getattr(rollup, count_column) + getattr(statement.excluded, count_column),
+            quantity_column: getattr(rollup, quantity_column) + getattr(statement.excluded, quantity_column),
+        }
+    ))
+
+def backfill_borrow_usage(db: Session) -> int:
+    """Add rollup rows for item-days that have none yet, computed from live
+    and archived borrow logs; returns the number of rows added.
+
+    Existing rows are kept: they also count logs deleted since (with their
+    items or categories) and, for logs older than borrow_logs.category_id,
+    the category an item had at the time, neither of which can be recovered
+    from borrow_logs."""
+    rollup = models.BorrowDailyRollup
+    # One row per event (the borrow, and the return if any), then summed per day
+    selects = []
+    for log in (models.BorrowLog, models.BorrowLogArchive):
+        selects.append(select(
+            func.date(log.borrow_date).label("day"),
+            log.item_id,
+            log.category_id,
+            log.quantity_borrowed.label("borrowed"),
+            literal(0).label("returned"),
+        ).where(log.borrow_date.isnot(None)))
+        selects.append(select(
+            func.date(log.actual_return_date),
+            log.item_id,
+            log.category_id,
+            literal(0),
+            log.quantity_borrowed,
+        ).where(log.status == models.BorrowStatus.RETURNED, log.actual_return_date.isnot(None)))
+    events = union_all(*selects).subquery()
+    
+    recorded = select(literal(1)).where(rollup.day == events.c.day, rollup.item_id == events.c.item_id).exists()
+    # Logs from before borrow_logs.category_id go under the item's current category
+    category_id = func.coalesce(events.c.category_id, models.Item.category_id)
+    totals = select(
+        events.c.day,
+        events.c.item_id,
+        category_id,
+        func.sum(case((events.c.borrowed > 0, 1), else_=0)),
+        func.sum(events.c.borrowed),
+        func.sum(case((events.c.returned > 0, 1), else_=0)),
+        func.sum(events.c.returned),
+    ).join(models.Item, models.Item.id == events.c.item_id).where(~recorded).group_by(
+        events.c.day, events.c.item_id, category_id
+    )
+    
+    table = rollup.__table__
+    before = db.scalar(select(func.count()).select_from(table))
+    db.execute(table.insert().from_select(
+        ["day", "item_id", "category_id", "borrowed_count", "borrowed_quantity", "returned_count", "returned_quantity"],
+        totals
+    ))
+    db.commit()
+    return db.scalar(select(func.count()).select_from(table)) - before
+
+USAGE_GROUP_COLUMNS = {
+    "day": models.BorrowDailyRollup.day,
+    "category": models.BorrowDailyRollup.category_id,
+    "item": models.BorrowDailyRollup.item_id,
+}
+USAGE_TOTAL_COLUMNS = ("borrowed_count", "borrowed_quantity", "returned_count", "returned_quantity")
+
+def usage_statement(
+    start_date: date,
+    end_date: date,
+    group_by: List[str],
+    category_id: Optional[int] = None,
+    item_id: Optional[int] = None
+):
+    """Borrow/return counts and quantities per group, read from the rollup"""
+    rollup = models.BorrowDailyRollup
+    keys = [
+        USAGE_GROUP_COLUMNS[group].label("day" if group == "day" else f"{group}_id")
+        for group in group_by
+    ]
+    totals = [
+        func.coalesce(func.sum(getattr(rollup, column)), 0).label(column)
+        for column in USAGE_TOTAL_COLUMNS
+    ]
+    
+    query = select(*keys, *totals).where(rollup.day >= start_date, rollup.day <= end_date)
+    if category_id:
+        query = query.where(rollup.category_id == category_id)
+    if item_id:
+        query = query.where(rollup.item_id == item_id)
+    if keys:
+        query = query.group_by(*[USAGE_GROUP_COLUMNS[group] for group in group_by])
+    
+    # Names are looked up once per group, after aggregating
+    usage = query.subquery()
+    columns = [usage.c[key.name] for key in keys]
+    outer = select(*columns)
+    if "category" in group_by:
+        outer = outer.add_columns(models.Category.name.label("category_name")).outerjoin(
+            models.Category, models.Category.id == usage.c.category_id
+        )
+    if "item" in group_by:
+        outer = outer.add_columns(models.Item.name.label("item_name")).outerjoin(
+            models.Item, models.Item.id == usage.c.item_id
+        )
+    outer = outer.add_columns(*[usage.c[column] for column in USAGE_TOTAL_COLUMNS]).select_from(usage)
+    return outer.order_by(*columns) if columns else outer
+
+def get_usage(db: Session, start_date: date, end_date: date, group_by: List[str], category_id: Optional[int] = None, item_id: Optional[int] = None):
+    statement = usage_statement(start_date, end_date, group_by, category_id=category_id, item_id=item_id)
+    return [dict(row._mapping) for row in db.execute(statement)]
 
 def create_borrow_log(db: Session, borrow_log: schemas.BorrowLogCreate):
     # Check if item exists and is borrowable
@@ -238,20 +780,211 @@ def create_borrow_log(db: Session, borrow_log: schemas.BorrowLogCreate):
         raise ValueError("Item not found")
     if not item.is_borrowable:
         raise ValueError("Item is not borrowable")
-    if item.available_quantity < borrow_log.quantity_borrowed:
+    
+    # Update item available quantity
+    if not reserve_stock(db, borrow_log.item_id, borrow_log.quantity_borrowed):
+        db.rollback()
         raise ValueError("Not enough available quantity")
     
     # Create borrow log
-    db_borrow_log = models.BorrowLog(**borrow_log.dict())
-    
-    # Update item available quantity
-    item.available_quantity -= borrow_log.quantity_borrowed
+    db_borrow_log = models.BorrowLog(**borrow_log.dict(), category_id=item.category_id)
     
     db.add(db_borrow_log)
+    # Flush to get the borrow_date default the rollup day is taken from
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise ValueError("User or admin not found")
+    record_borrow_usage(
+        db, db_borrow_log.borrow_date or datetime.now(), item.id,
+        models.BorrowStatus.BORROWED, db_borrow_log.quantity_borrowed,
+        category_id=db_borrow_log.category_id
+    )
     db.commit()
+    invalidate_dashboard_stats()
     db.refresh(db_borrow_log)
     return db_borrow_log
 
+# Batch borrows and returns validate every line against one lookup, move stock
+# with one UPDATE for all items and write the logs with one INSERT. Errors are
+# {"index": position in the request, "error": message}; with all_or_nothing
+# any error means nothing is written.
+def _record_batch_usage(db: Session, events, status: models.BorrowStatus):
+    """Add (day, item_id, category_id, quantity) events to the rollup, one
+    upsert per day x item"""
+    totals = {}
+    for day, item_id, category_id, quantity in events:
+        key = (_as_day(day), item_id, category_id)
+        count, total = totals.get(key, (0, 0))
+        totals[key] = (count + 1, total + quantity)
+    for (day, item_id, category_id), (count, quantity) in totals.items():
+        record_borrow_usage(db, day, item_id, status, quantity, category_id=category_id, count=count)
+
+def create_borrow_logs_batch(
+    db: Session,
+    lines: List[schemas.BorrowBatchLine],
+    admin_id: int,
+    expected_return_date: Optional[datetime] = None,
+    notes: Optional[str] = None,
+    all_or_nothing: bool = True
+):
+    """Borrow every line in one transaction; returns (borrow_logs, errors)"""
+    items = {
+        row.id: row for row in db.execute(
+            select(models.Item.id, models.Item.category_id, models.Item.is_borrowable, models.Item.available_quantity)
+            .where(models.Item.id.in_({line.item_id for line in lines}))
+        )
+    }
+    user_ids = set(db.scalars(select(models.User.id).where(models.User.id.in_({line.user_id for line in lines}))))
+    
+    # Lines for the same item draw on its stock in request order
+    remaining = {item_id: row.available_quantity for item_id, row in items.items()}
+    accepted, errors = [], []
+    for index, line in enumerate(lines):
+        item = items.get(line.item_id)
+        return_date = line.expected_return_date or expected_return_date
+        if item is None:
+            error = "Item not found"
+        elif not item.is_borrowable:
+            error = "Item is not borrowable"
+        elif line.user_id not in user_ids:
+            error = "User not found"
+        elif return_date is None:
+            error = "expected_return_date is required"
+        elif remaining[line.item_id] < line.quantity_borrowed:
+            error = "Not enough available quantity"
+        else:
+            remaining[line.item_id] -= line.quantity_borrowed
+            accepted.append((index, line, return_date))
+            continue
+        errors.append({"index": index, "error": error})
+    
+    if not accepted or (errors and all_or_nothing):
+        return [], errors
+    
+    quantities = {}
+    for _, line, _ in accepted:
+        quantities[line.item_id] = quantities.get(line.item_id, 0) + line.quantity_borrowed
+    reserved = reserve_stock_batch(db, quantities)
+    if len(reserved) < len(quantities):
+        # Stock went down between the read above and the update
+        errors.extend(
+            {"index": index, "error": "Not enough available quantity"}
+            for index, line, _ in accepted if line.item_id not in reserved
+        )
+        errors.sort(key=lambda error: error["index"])
+        accepted = [entry for entry in accepted if entry[1].item_id in reserved]
+        if not accepted or all_or_nothing:
+            db.rollback()
+            return [], errors
+    
+    # One multi-row INSERT; RETURNING order isn't guaranteed, so the rollup
+    # works from the returned columns and the logs are read back by id
+    inserted = db.execute(
+        insert(models.BorrowLog).returning(
+            models.BorrowLog.id, models.BorrowLog.item_id, models.BorrowLog.category_id,
+            models.BorrowLog.borrow_date, models.BorrowLog.quantity_borrowed
+        ),
+        [
+            {
+                "item_id": line.item_id,
+                "user_id": line.user_id,
+                "admin_id": admin_id,
+                "quantity_borrowed": line.quantity_borrowed,
+                "category_id": items[line.item_id].category_id,
+                "expected_return_date": return_date,
+                "notes": line.notes if line.notes is not None else notes,
+            }
+            for _, line, return_date in accepted
+        ]
+    ).all()
+    _record_batch_usage(db, (
+        (row.borrow_date or datetime.now(), row.item_id, row.category_id, row.quantity_borrowed)
+        for row in inserted
+    ), models.BorrowStatus.BORROWED)
+    db.commit()
+    invalidate_dashboard_stats()
+    
+    # Ids are handed out in insert order, which is the order of the lines
+    borrow_logs = db.scalars(
+        select(models.BorrowLog).where(models.BorrowLog.id.in_([row.id for row in inserted])).order_by(models.BorrowLog.id)
+    ).all()
+    return borrow_logs, errors
+
+def return_borrow_logs_batch(
+    db: Session,
+    borrow_log_ids: List[int],
+    notes: Optional[str] = None,
+    all_or_nothing: bool = True
+):
+    """Return every borrow log in one transaction; returns (borrow_logs, errors)"""
+    logs = {
+        row.id: row for row in db.execute(
+            select(models.BorrowLog.id, models.BorrowLog.status)
+            .where(models.BorrowLog.id.in_(set(borrow_log_ids)))
+        )
+    }
+    accepted, errors, seen = [], [], set()
+    for index, borrow_log_id in enumerate(borrow_log_ids):
+        log = logs.get(borrow_log_id)
+        if log is None:
+            error = "Borrow log not found"
+        elif borrow_log_id in seen:
+            error = "Duplicate borrow log"
+        elif log.status == models.BorrowStatus.RETURNED:
+            error = "Item already returned"
+        else:
+            seen.add(borrow_log_id)
+            accepted.append((index, borrow_log_id))
+            continue
+        errors.append({"index": index, "borrow_log_id": borrow_log_id, "error": error})
+    
+    if not accepted or (errors and all_or_nothing):
+        return [], errors
+    
+    # Claim the returns atomically so a concurrent return credits the stock once
+    returned_at = datetime.now()
+    values = {"status": models.BorrowStatus.RETURNED, "actual_return_date": returned_at}
+    if notes:
+        values["notes"] = notes
+    claimed = {
+        row.id: row for row in db.execute(
+            update(models.BorrowLog).where(
+                models.BorrowLog.id.in_([borrow_log_id for _, borrow_log_id in accepted]),
+                models.BorrowLog.status != models.BorrowStatus.RETURNED
+            ).values(**values).returning(
+                models.BorrowLog.id, models.BorrowLog.item_id, models.BorrowLog.category_id,
+                models.BorrowLog.quantity_borrowed
+            ).execution_options(synchronize_session=False)
+        )
+    }
+    if len(claimed) < len(accepted):
+        errors.extend(
+            {"index": index, "borrow_log_id": borrow_log_id, "error": "Item already returned"}
+            for index, borrow_log_id in accepted if borrow_log_id not in claimed
+        )
+        errors.sort(key=lambda error: error["index"])
+        if not claimed or all_or_nothing:
+            db.rollback()
+            return [], errors
+    
+    quantities = {}
+    for row in claimed.values():
+        quantities[row.item_id] = quantities.get(row.item_id, 0) + row.quantity_borrowed
+    release_stock_batch(db, quantities)
+    _record_batch_usage(db, (
+        (returned_at, row.item_id, row.category_id, row.quantity_borrowed)
+        for row in claimed.values()
+    ), models.BorrowStatus.RETURNED)
+    db.commit()
+    invalidate_dashboard_stats()
+    
+    borrow_logs = db.scalars(
+        select(models.BorrowLog).where(models.BorrowLog.id.in_(claimed)).order_by(models.BorrowLog.id)
+    ).all()
+    return borrow_logs, errors
+
 def update_borrow_log(db: Session, borrow_log_id: int, borrow_log_update: schemas.BorrowLogUpdate):
     db_borrow_log = get_borrow_log(db, borrow_log_id)
     if db_borrow_log:
@@ -268,14 +1001,27 @@ def update_borrow_log(db: Session, borrow_log_id: int, borrow_log_update: schema
                     raise ValueError(f"Invalid status: {update_data['status']}")
         
         # If returning item, update available quantity
-# If returning item, update available quantity
         if 'status' in update_data and update_data['status'] == models.BorrowStatus.RETURNED:
             if not db_borrow_log.actual_return_date:
                 update_data['actual_return_date'] = datetime.now()
             
+            # Claim the return atomically so concurrent returns credit the stock once
+            claimed = db.query(models.BorrowLog).filter(
+                models.BorrowLog.id == borrow_log_id,
+                models.BorrowLog.status != models.BorrowStatus.RETURNED
+            ).update(
+                {models.BorrowLog.status: models.BorrowStatus.RETURNED},
+                synchronize_session=False
+            )
+            
             # Return the borrowed quantity to available quantity
-            item = db_borrow_log.item
-            item.available_quantity += db_borrow_log.quantity_borrowed        
+            if claimed:
+                release_stock(db, db_borrow_log.item_id, db_borrow_log.quantity_borrowed)
+                record_borrow_usage(
+                    db, update_data.get('actual_return_date') or db_borrow_log.actual_return_date,
+                    db_borrow_log.item_id, models.BorrowStatus.RETURNED, db_borrow_log.quantity_borrowed,
+                    category_id=db_borrow_log.category_id
+                )
         # If marking as overdue
         if 'status' in update_data and update_data['status'] == models.BorrowStatus.OVERDUE:
             update_data['actual_return_date'] = None
@@ -284,94 +1030,395 @@ def update_borrow_log(db: Session, borrow_log_id: int, borrow_log_update: schema
             setattr(db_borrow_log, field, value)
         
         db.commit()
+        invalidate_dashboard_stats()
         db.refresh(db_borrow_log)
     return db_borrow_log
 def delete_borrow_log(db: Session, borrow_log_id: int):
     db_borrow_log = get_borrow_log(db, borrow_log_id)
     if db_borrow_log:
-        # Return quantity if item was borrowed
-        if db_borrow_log.status == models.BorrowStatus.BORROWED:
-            item = db_borrow_log.item
-            item.available_quantity += db_borrow_log.quantity_borrowed
+        # Return quantity if item was borrowed (overdue items are still out too)
+        if db_borrow_log.status in (models.BorrowStatus.BORROWED, models.BorrowStatus.OVERDUE):
+            release_stock(db, db_borrow_log.item_id, db_borrow_log.quantity_borrowed)
+        
+        # Take the log's events back out of the usage rollup
+        if db_borrow_log.borrow_date:
+            record_borrow_usage(
+                db, db_borrow_log.borrow_date, db_borrow_log.item_id,
+                models.BorrowStatus.BORROWED, db_borrow_log.quantity_borrowed,
+                category_id=db_borrow_log.category_id, sign=-1
+            )
+        if db_borrow_log.status == models.BorrowStatus.RETURNED and db_borrow_log.actual_return_date:
+            record_borrow_usage(
+                db, db_borrow_log.actual_return_date, db_borrow_log.item_id,
+                models.BorrowStatus.RETURNED, db_borrow_log.quantity_borrowed,
+                category_id=db_borrow_log.category_id, sign=-1
+            )
         
         db.delete(db_borrow_log)
         db.commit()
+        invalidate_dashboard_stats()
     return db_borrow_log
 
 # Dashboard statistics
-def get_dashboard_stats(db: Session, user_id: Optional[int] = None, user_role: Optional[str] = None):
-    # System-wide stats (for admins)
-    total_items = db.query(models.Item).count()
-    total_categories = db.query(models.Category).count()
-    total_users = db.query(models.User).count()
-    
-    low_stock_items = db.query(models.Item).filter(
-        models.Item.available_quantity <= models.Item.min_stock_level
-    ).count()
-    
-    expired_items = db.query(models.Item).filter(
-        and_(
-            models.Item.expiry_date.isnot(None),
-            models.Item.expiry_date < datetime.now()
-        )
-    ).count()
-    
-    items_for_disposal = db.query(models.Item).filter(
-        models.Item.condition == "for_disposal"
-    ).count()
-    
-    # Borrow statistics - different logic for admin vs viewer
-    if user_role == "admin":
-        # Admin sees all borrowed items
-        total_borrowed_items = db.query(models.BorrowLog).filter(
-            models.BorrowLog.status == models.BorrowStatus.BORROWED
-        ).count()
-        
-        overdue_borrows = db.query(models.BorrowLog).filter(
-            and_(
-                models.BorrowLog.status == models.BorrowStatus.BORROWED,
-                models.BorrowLog.expected_return_date < datetime.now()
-            )
-        ).count()
-    else:
-        # Viewer sees only their own borrowed items
-        total_borrowed_items = db.query(models.BorrowLog).filter(
-            and_(
-                models.BorrowLog.status == models.BorrowStatus.BORROWED,
-                models.BorrowLog.user_id == user_id
-            )
-        ).count()
-        
-        overdue_borrows = db.query(models.BorrowLog).filter(
-            and_(
-                models.BorrowLog.status == models.BorrowStatus.BORROWED,
-                models.BorrowLog.user_id == user_id,
-                models.BorrowLog.expected_return_date < datetime.now()
-            )
-        ).count()
-    
+# Dashboard polls are served from a short-lived snapshot keyed by role/user.
+# Writes below call invalidate_dashboard_stats() so counts never lag behind
+# a change made through the API by more than one request.
+DASHBOARD_STATS_TTL_SECONDS = float(os.getenv("DASHBOARD_STATS_TTL_SECONDS", "15"))
+
+_dashboard_stats_cache = {}
+_dashboard_stats_generation = 0
+_dashboard_stats_lock = threading.Lock()
+
+def invalidate_dashboard_stats():
+    global _dashboard_stats_generation
+    with _dashboard_stats_lock:
+        _dashboard_stats_generation += 1
+        _dashboard_stats_cache.clear()
+
+def dashboard_cache_lookup(key):
+    """Return (snapshot or None, generation) for a dashboard cache key"""
+    with _dashboard_stats_lock:
+        cached = _dashboard_stats_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1], _dashboard_stats_generation
+        return None, _dashboard_stats_generation
+
+def dashboard_cache_store(key, generation, value):
+    with _dashboard_stats_lock:
+        # Don't store a snapshot that a concurrent write has already invalidated
+        if generation == _dashboard_stats_generation:
+            _dashboard_stats_cache[key] = (time.monotonic() + DASHBOARD_STATS_TTL_SECONDS, value)
+
+def _cached_dashboard_stats(key, compute):
+    value, generation = dashboard_cache_lookup(key)
+    if value is None:
+        value = compute()
+        dashboard_cache_store(key, generation, value)
+    return value
+
+def _count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def system_stats_statement():
+    now = datetime.now()
+    total_categories = select(func.count(models.Category.id)).scalar_subquery()
+    total_users = select(func.count(models.User.id)).scalar_subquery()
+    # Expiry counts are range scans on ix_items_expiry_date
+    expired_items = select(func.count()).where(models.Item.expiry_date < now).scalar_subquery()
+    expiring_soon_items = select(func.count()).where(*expiring_window(EXPIRY_WARNING_DAYS, now)).scalar_subquery()
+
+    return select(
+        func.count(models.Item.id),
+        total_categories,
+        total_users,
+        _count_where(models.Item.available_quantity <= models.Item.min_stock_level),
+        expired_items,
+        _count_where(models.Item.condition == "for_disposal"),
+        expiring_soon_items,
+    )
+
+def system_stats_from_row(row):
+    return {
+        "total_items": row[0],
+        "total_categories": row[1],
+        "total_users": row[2],
+        "low_stock_items": row[3],
+        "expired_items": row[4],
+        "items_for_disposal": row[5],
+        "expiring_soon_items": row[6],
+    }
+
+def borrow_stats_statement(user_id: Optional[int] = None):
+    query = select(
+        func.count(models.BorrowLog.id),
+        _count_where(overdue_condition(models.BorrowLog)),
+    ).where(models.BorrowLog.status.in_(OUT_STATUSES))
+
+    # Viewer sees only their own borrowed items
+    if user_id is not None:
+        query = query.where(models.BorrowLog.user_id == user_id)
+    return query
+
+def borrow_stats_from_row(row):
     return {
-        "total_items": total_items,
-        "total_categories": total_categories,
-        "total_users": total_users,
-        "low_stock_items": low_stock_items,
-        "expired_items": expired_items,
-        "items_for_disposal": items_for_disposal,
-        "total_borrowed_items": total_borrowed_items,
-        "overdue_borrows": overdue_borrows
+        "total_borrowed_items": row[0],
+        "overdue_borrows": row[1],
     }
+
+def dashboard_borrow_scope(user_id: Optional[int], user_role: Optional[str]):
+    """Cache key and user filter for borrow stats - admin sees all borrowed items, others only their own"""
+    if user_role == "admin":
+        return ("admin", None), None
+    return (user_role, user_id), user_id
+
+def get_dashboard_stats(db: Session, user_id: Optional[int] = None, user_role: Optional[str] = None):
+    # System-wide stats are the same for everyone
+    stats = dict(_cached_dashboard_stats(
+        "system",
+        lambda: system_stats_from_row(db.execute(system_stats_statement()).one())
+    ))
+
+    # Borrow statistics
+    borrow_key, borrow_user_id = dashboard_borrow_scope(user_id, user_role)
+    stats.update(_cached_dashboard_stats(
+        borrow_key,
+        lambda: borrow_stats_from_row(db.execute(borrow_stats_statement(borrow_user_id)).one())
+    ))
+
+    return stats
+
 # Add this to crud.py
 def update_overdue_borrows(db: Session):
     """Update status of borrowed items that are past due date"""
-    overdue_logs = db.query(models.BorrowLog).filter(
+    # Single set-based UPDATE served by ix_borrow_logs_status_expected_return;
+    # rows are never loaded into the session, rowcount gives the number flipped
+    updated = db.query(models.BorrowLog).filter(
         and_(
             models.BorrowLog.status == models.BorrowStatus.BORROWED,
             models.BorrowLog.expected_return_date < datetime.now()
         )
-    ).all()
+    ).update(
+        {models.BorrowLog.status: models.BorrowStatus.OVERDUE},
+        synchronize_session=False
+    )
     
-    for log in overdue_logs:
-        log.status = models.BorrowStatus.OVERDUE
+    db.commit()
+    invalidate_dashboard_stats()
+    return updated
+# Items whose expiry date is less than this many days away are expiring soon
+EXPIRY_WARNING_DAYS = int(os.getenv("EXPIRY_WARNING_DAYS", "30"))
+
+def expiring_window(days: int, now: Optional[datetime] = None):
+    """Conditions for items that haven't expired yet but will within `days`"""
+    now = now or datetime.now()
+    return [models.Item.expiry_date >= now, models.Item.expiry_date < now + timedelta(days=days)]
+
+def update_expired_items(db: Session):
+    """Mark items past their expiry date as expired, and put back the
+    condition of items it expired whose date has since moved into the
+    future; returns the number of items newly expired, restored and
+    expiring within EXPIRY_WARNING_DAYS"""
+    now = datetime.now()
+    # Single set-based UPDATE over the ix_items_expiry_date range; items
+    # already expired or set for disposal keep their condition
+    expired = db.query(models.Item).filter(
+        models.Item.expiry_date < now,
+        models.Item.condition.notin_(("expired", "for_disposal"))
+    ).update(
+        {models.Item.condition_before_expiry: models.Item.condition, models.Item.condition: "expired"},
+        synchronize_session=False
+    )
+    # Items marked expired by hand have no condition_before_expiry and stay expired
+    restored = db.query(models.Item).filter(
+        models.Item.condition == "expired",
+        models.Item.condition_before_expiry.isnot(None),
+        or_(models.Item.expiry_date.is_(None), models.Item.expiry_date >= now)
+    ).update(
+        {models.Item.condition: models.Item.condition_before_expiry, models.Item.condition_before_expiry: None},
+        synchronize_session=False
+    )
+    expiring_soon = db.scalar(
+        select(func.count()).where(*expiring_window(EXPIRY_WARNING_DAYS, now))
+    )
     
     db.commit()
-    return len(overdue_logs)
\ No newline at end of file
+    if expired or restored:
+        invalidate_dashboard_stats()
+    return expired, restored, expiring_soon
+
+# Returned logs older than BORROW_ARCHIVE_AFTER_DAYS are moved from borrow_logs
+# to borrow_logs_archive, keeping the hot table (overdue scans, dashboard
+# counts, list pages) small. Reads that can match them include the archive.
+BORROW_ARCHIVE_AFTER_DAYS = int(os.getenv("BORROW_ARCHIVE_AFTER_DAYS", "180"))
+BORROW_ARCHIVE_BATCH_SIZE = int(os.getenv("BORROW_ARCHIVE_BATCH_SIZE", "1000"))
+
+def archive_borrow_logs(db: Session, older_than_days: Optional[int] = None, batch_size: Optional[int] = None) -> int:
+    """Move returned logs older than the cutoff into the archive, one
+    transaction per batch; returns the number of logs moved"""
+    older_than_days = BORROW_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or BORROW_ARCHIVE_BATCH_SIZE
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    live = models.BorrowLog.__table__
+    archive = models.BorrowLogArchive.__table__
+    columns = [column.name for column in live.columns]
+    
+    newest_id = db.scalar(select(func.max(live.c.id)))
+    moved, last_id = 0, 0
+    while newest_id is not None and last_id < newest_id:
+        # Each batch is a window of ids, read straight off the primary key
+        window_end = min(last_id + batch_size, newest_id)
+        eligible = select(*[live.c[column] for column in columns]).where(
+            live.c.id > last_id,
+            live.c.id <= window_end,
+            # Unary + keeps SQLite on the id range instead of the status index
+            literal_column(f"+{live.name}.status") == models.BorrowStatus.RETURNED.name,
+            live.c.actual_return_date < cutoff
+        )
+        # The copy is the first statement, so the batch holds the write lock
+        # from the start instead of upgrading from a read
+        ids = db.scalars(archive.insert().from_select(columns, eligible).returning(archive.c.id)).all()
+        if ids:
+            db.execute(live.delete().where(live.c.id.in_(ids)))
+        db.commit()
+        moved += len(ids)
+        last_id = window_end
+    
+    if moved:
+        invalidate_dashboard_stats()
+    return moved
+
+# Delta sync: sync_changes holds each row's latest change seq (maintained by
+# the triggers in change_feed.py), so a client sends the seq it last saw and
+# gets back only what changed after it
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "1000"))
+
+# Entity name in sync_changes -> (response key, models holding its rows)
+SYNC_ENTITIES = {
+    "item": ("items", (models.Item,)),
+    "category": ("categories", (models.Category,)),
+    "borrow_log": ("borrow_logs", (models.BorrowLog, models.BorrowLogArchive)),
+}
+
+def get_changes(db: Session, since: int = 0, limit: Optional[int] = None, user_id: Optional[int] = None):
+    """Rows changed after seq `since` (oldest change first, at most limit)
+    and the ids deleted since then. With user_id, borrow logs are limited to
+    that user's"""
+    limit = limit or SYNC_PAGE_SIZE
+    change = models.SyncChange
+    query = select(change.entity, change.entity_id, change.seq, change.deleted).where(change.seq > since)
+    if user_id is not None:
+        query = query.where(or_(change.entity != "borrow_log", change.user_id == user_id))
+    rows = db.execute(query.order_by(change.seq).limit(limit + 1)).all()
+
+    result = {"next_since": since, "has_more": len(rows) > limit}
+    rows = rows[:limit]
+    if not rows:
+        # A seq this database never reached means the client's cache is from
+        # another copy of it
+        if since > (db.scalar(select(func.max(change.seq))) or 0):
+            return {"next_since": 0, "reset": True}
+        return result
+    result["next_since"] = rows[-1].seq
+
+    changed = {entity: [] for entity in SYNC_ENTITIES}
+    deleted = {entity: [] for entity in SYNC_ENTITIES}
+    for entity, entity_id, seq, is_deleted in rows:
+        (deleted if is_deleted else changed)[entity].append(entity_id)
+
+    for entity, (key, entity_models) in SYNC_ENTITIES.items():
+        found = []
+        if changed[entity]:
+            for model in entity_models:
+                found += db.scalars(select(model).where(model.id.in_(changed[entity]))).all()
+        # Deleted after the change was read; its tombstone comes next time
+        found_ids = {row.id for row in found}
+        deleted[entity] += [entity_id for entity_id in changed[entity] if entity_id not in found_ids]
+        result[key] = found
+        result[f"deleted_{key}"] = deleted[entity]
+
+    # Counts change with every item write; clients count their cached items
+    for category in result["categories"]:
+        category.items_count = None
+    return result
+
+# Report exports select plain columns rather than ORM objects so the rows can
+# be streamed with yield_per at constant memory
+REPORT_BATCH_SIZE = int(os.getenv("REPORT_BATCH_SIZE", "500"))
+
+def _date_range(column, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """Conditions for column within [start_date, end_date], both days inclusive"""
+    conditions = []
+    if start_date:
+        conditions.append(column >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        conditions.append(column < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    return conditions
+
+def inventory_report_statement(
+    low_stock: Optional[bool] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    low = models.Item.available_quantity <= models.Item.min_stock_level
+    query = select(
+        models.Item.name,
+        models.Category.name,
+        models.Item.quantity,
+        models.Item.available_quantity,
+        models.Item.unit,
+        models.Item.storage_location,
+        models.Item.condition,
+        case((low, "LOW STOCK"), else_="OK"),
+    ).outerjoin(models.Category, models.Item.category_id == models.Category.id)
+    
+    if low_stock:
+        query = query.filter(low)
+    # Date range applies to when the item was added
+    query = query.filter(*_date_range(models.Item.created_at, start_date, end_date))
+    return query.order_by(models.Item.id)
+
+def expired_report_statement(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    query = select(
+        models.Item.name,
+        models.Category.name,
+        models.Item.quantity,
+        models.Item.unit,
+        models.Item.storage_location,
+        models.Item.expiry_date,
+    ).outerjoin(models.Category, models.Item.category_id == models.Category.id).filter(
+        or_(
+            models.Item.condition == "expired",
+            and_(models.Item.expiry_date.isnot(None), models.Item.expiry_date < datetime.now())
+        )
+    )
+    # Date range applies to the expiry date
+    query = query.filter(*_date_range(models.Item.expiry_date, start_date, end_date))
+    return query.order_by(models.Item.expiry_date, models.Item.id)
+
+def borrowed_report_statement(
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    overdue_only: Optional[bool] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    """Statement for the borrow log export, or None if the filters can't match"""
+    if status and not hasattr(models.BorrowStatus, status.upper()):
+        return None
+    
+    def rows(log):
+        query = select(
+            log.id.label("log_id"),
+            models.Item.name,
+            models.User.full_name,
+            log.quantity_borrowed,
+            log.borrow_date,
+            log.expected_return_date,
+            log.actual_return_date,
+            log.status,
+        ).join(models.Item, log.item_id == models.Item.id).join(
+            models.User, log.user_id == models.User.id
+        )
+        
+        if user_id:
+            query = query.filter(log.user_id == user_id)
+        
+        if status:
+            query = query.filter(log.status == getattr(models.BorrowStatus, status.upper()))
+        
+        if overdue_only:
+            query = query.filter(overdue_condition(log))
+        
+        # Date range applies to when the item was borrowed
+        return query.filter(*_date_range(log.borrow_date, start_date, end_date))
+    
+    if not borrow_log_filters_reach_archive(status, overdue_only):
+        return rows(models.BorrowLog).order_by(models.BorrowLog.id)
+    report = union_all(rows(models.BorrowLog), rows(models.BorrowLogArchive)).subquery()
+    return select(*[column for column in report.c if column.name != "log_id"]).order_by(report.c.log_id)
+
+def stream_report_rows(db: Session, statement):
+    """Yield result rows, fetching REPORT_BATCH_SIZE at a time"""
+    result = db.execute(statement.execution_options(yield_per=REPORT_BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
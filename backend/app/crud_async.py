@@ -0,0 +1,119 @@
+#crud_async.py
+# Awaitable versions of the hot crud reads. They share statement builders with
+# crud: an AsyncSession runs them natively on aiosqlite, while a regular
+# Session (USE_ASYNC_DB off) runs the sync crud function in the threadpool, so
+# routes can await these whichever get_read_db is configured.
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from . import crud, models
+from . import search as search_module
+
+async def get_user(db, user_id: int):
+    if not isinstance(db, AsyncSession):
+        return await run_in_threadpool(crud.get_user, db, user_id)
+    return (await db.scalars(crud.user_statement(user_id))).first()
+
+async def get_items(
+    db,
+    skip: int = 0,
+    limit: int = 100,
+    search: Optional[str] = None,
+    category_id: Optional[int] = None,
+    storage_location: Optional[str] = None,
+    condition: Optional[str] = None,
+    low_stock: Optional[bool] = None,
+    borrowable_only: Optional[bool] = None,
+    after_id: Optional[int] = None,
+    expires_within_days: Optional[int] = None,
+    stockout_within_days: Optional[float] = None,
+    below_reorder_point: Optional[bool] = None,
+    sort: Optional[str] = None
+):
+    filters = dict(
+        skip=skip,
+        limit=limit,
+        search=search,
+        category_id=category_id,
+        storage_location=storage_location,
+        condition=condition,
+        low_stock=low_stock,
+        borrowable_only=borrowable_only,
+        after_id=after_id,
+        expires_within_days=expires_within_days,
+        stockout_within_days=stockout_within_days,
+        below_reorder_point=below_reorder_point,
+        sort=sort
+    )
+    if not isinstance(db, AsyncSession):
+        return await run_in_threadpool(crud.get_items, db, **filters)
+
+    # Relevance ranking only applies to unsorted offset pages; cursor pages follow id order
+    ranked = False
+    if search and after_id is None and not sort:
+        count_statement = search_module.match_count_statement(search)
+        ranked = count_statement is not None and search_module.within_ranking_limit(
+            (await db.execute(count_statement)).scalar()
+        )
+
+    return (await db.scalars(crud.items_statement(ranked=ranked, **filters))).all()
+
+async def get_borrow_logs(
+    db,
+    skip: int = 0,
+    limit: int = 100,
+    user_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+    status: Optional[str] = None,
+    overdue_only: Optional[bool] = None,
+    after_id: Optional[int] = None
+):
+    filters = dict(
+        skip=skip,
+        limit=limit,
+        user_id=user_id,
+        item_id=item_id,
+        status=status,
+        overdue_only=overdue_only,
+        after_id=after_id
+    )
+    if not isinstance(db, AsyncSession):
+        return await run_in_threadpool(crud.get_borrow_logs, db, **filters)
+
+    statement = crud.borrow_logs_statement(**filters)
+    if statement is None:
+        return []
+    
+    # Same archive handling as crud.get_borrow_logs
+    if crud.borrow_log_filters_reach_archive(status, overdue_only):
+        archive_max_id = await db.scalar(crud.archived_borrow_log_max_id_statement())
+        if archive_max_id is not None and (after_id is None or archive_max_id > after_id):
+            page = (await db.execute(crud.borrow_log_page_statement(**filters))).all()
+            live_ids = [log_id for log_id, archived in page if not archived]
+            archived_ids = [log_id for log_id, archived in page if archived]
+            live_logs = (await db.scalars(crud.borrow_log_rows_statement(models.BorrowLog, live_ids))).unique().all() if live_ids else []
+            archived_logs = (await db.scalars(crud.borrow_log_rows_statement(models.BorrowLogArchive, archived_ids))).unique().all() if archived_ids else []
+            return crud.order_borrow_log_page(page, live_logs, archived_logs)
+    return (await db.scalars(statement)).all()
+
+async def get_dashboard_stats(db, user_id: Optional[int] = None, user_role: Optional[str] = None):
+    if not isinstance(db, AsyncSession):
+        return await run_in_threadpool(crud.get_dashboard_stats, db, user_id, user_role)
+
+    # Same snapshot cache as crud.get_dashboard_stats
+    stats, generation = crud.dashboard_cache_lookup("system")
+    if stats is None:
+        stats = crud.system_stats_from_row((await db.execute(crud.system_stats_statement())).one())
+        crud.dashboard_cache_store("system", generation, stats)
+    stats = dict(stats)
+
+    borrow_key, borrow_user_id = crud.dashboard_borrow_scope(user_id, user_role)
+    borrow_stats, generation = crud.dashboard_cache_lookup(borrow_key)
+    if borrow_stats is None:
+        borrow_stats = crud.borrow_stats_from_row(
+            (await db.execute(crud.borrow_stats_statement(borrow_user_id))).one()
+        )
+        crud.dashboard_cache_store(borrow_key, generation, borrow_stats)
+    stats.update(borrow_stats)
+
+    return stats
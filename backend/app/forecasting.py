@@ -0,0 +1,116 @@
+# forecasting.py
+# Per-item consumption rates and reorder points, computed for every item in
+# one batch from the daily borrow usage rollups and stored in item_forecasts.
+#
+#   python -m app.forecasting
+#
+# The API also runs it every 6 hours (scheduler.py, started by main.py unless
+# RUN_SCHEDULER=false). Days until stockout is not stored: it is
+# available_quantity / daily_rate, evaluated by crud at query time so it
+# follows stock changes between runs.
+import math
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Integer, cast, func, literal, select
+from sqlalchemy.orm import Session
+
+from .database import engine, SessionLocal
+from . import models
+
+FORECAST_WINDOW_DAYS = int(os.getenv("FORECAST_WINDOW_DAYS", "90"))
+# Usage this many days old counts half as much as today's
+FORECAST_HALF_LIFE_DAYS = float(os.getenv("FORECAST_HALF_LIFE_DAYS", "30"))
+REORDER_LEAD_TIME_DAYS = float(os.getenv("REORDER_LEAD_TIME_DAYS", "14"))
+# Safety stock in standard deviations of lead-time demand (1.65 ~ 95% service)
+REORDER_SERVICE_Z = float(os.getenv("REORDER_SERVICE_Z", "1.65"))
+
+def usage_history(db: Session, today: date):
+    """(item_id, age_in_days, net_quantity) for every item-day in the window,
+    as NumPy arrays"""
+    rollup = models.BorrowDailyRollup
+    start = today - timedelta(days=FORECAST_WINDOW_DAYS - 1)
+    age = cast(func.julianday(literal(today.isoformat())) - func.julianday(rollup.day), Integer)
+    rows = db.execute(
+        select(
+            rollup.item_id,
+            age,
+            func.sum(rollup.borrowed_quantity - rollup.returned_quantity),
+        ).where(rollup.day >= start, rollup.day <= today).group_by(rollup.item_id, rollup.day)
+    ).all()
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float64)
+    # Transpose in Python first: NumPy converts Row objects one element at a time
+    item_ids, ages, quantities = zip(*rows)
+    return (
+        np.array(item_ids, dtype=np.int64),
+        np.array(ages, dtype=np.int64),
+        np.array(quantities, dtype=np.float64),
+    )
+
+def forecast_rates(item_ids: np.ndarray, history_items: np.ndarray, ages: np.ndarray, quantities: np.ndarray):
+    """Recency-weighted mean and standard deviation of daily net usage for
+    each id in item_ids (sorted), counting days without usage as zero"""
+    if len(item_ids) == 0:
+        return np.zeros(0), np.zeros(0)
+    day_weights = 0.5 ** (np.arange(FORECAST_WINDOW_DAYS) / FORECAST_HALF_LIFE_DAYS)
+    total_weight = day_weights.sum()
+
+    # Rows for items that no longer exist are dropped
+    positions = np.searchsorted(item_ids, history_items)
+    positions = np.minimum(positions, len(item_ids) - 1)
+    known = item_ids[positions] == history_items
+    positions, ages, quantities = positions[known], ages[known], quantities[known]
+
+    weights = day_weights[ages]
+    mean = np.bincount(positions, weights=quantities * weights, minlength=len(item_ids)) / total_weight
+    mean_square = np.bincount(positions, weights=quantities ** 2 * weights, minlength=len(item_ids)) / total_weight
+    std = np.sqrt(np.maximum(mean_square - mean ** 2, 0))
+    # More returned than borrowed means stock isn't being used up
+    return np.maximum(mean, 0), std
+
+def reorder_points(rates: np.ndarray, stds: np.ndarray) -> np.ndarray:
+    lead_time_demand = rates * REORDER_LEAD_TIME_DAYS
+    safety_stock = REORDER_SERVICE_Z * stds * math.sqrt(REORDER_LEAD_TIME_DAYS)
+    return np.ceil(lead_time_demand + safety_stock).astype(np.int64)
+
+def compute_item_forecasts(db: Session, today: date = None) -> int:
+    """Recompute and replace every item's forecast; returns the number of items"""
+    today = today or date.today()
+    item_ids = np.fromiter(db.scalars(select(models.Item.id).order_by(models.Item.id)), dtype=np.int64)
+    history_items, ages, quantities = usage_history(db, today)
+    rates, stds = forecast_rates(item_ids, history_items, ages, quantities)
+    points = reorder_points(rates, stds)
+
+    computed_at = datetime.now()
+    forecasts = models.ItemForecast.__table__
+    db.execute(forecasts.delete())
+    if len(item_ids):
+        db.execute(forecasts.insert(), [
+            {
+                "item_id": item_id,
+                "daily_rate": rate,
+                "daily_rate_std": std,
+                "reorder_point": point,
+                "computed_at": computed_at,
+            }
+            for item_id, rate, std, point in zip(item_ids.tolist(), rates.tolist(), stds.tolist(), points.tolist())
+        ])
+    db.commit()
+    return len(item_ids)
+
+def main():
+    models.ItemForecast.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        count = compute_item_forecasts(db)
+        print(f"Forecast {count} items in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,38 @@
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 import os
-from .database import engine, get_db
-from . import models, schemas, crud
-from .routes import items, categories, users, borrowed, auth, profile
+from .database import engine, get_db, add_missing_columns
+from . import models, schemas, crud, search, upload_store, change_feed, archive
+from .routes import items, categories, users, borrowed, auth, profile, reports, sync
+from .utils import image_helper
+from .utils.static_files import ImmutableStaticFiles
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
 
+# Columns added to the models since the database file was first created;
+# before the id rebuild below, which copies every model column
+add_missing_columns(engine, models.Base.metadata)
+
+# borrow_logs created before its ids were AUTOINCREMENT
+archive.setup_borrow_log_ids(engine)
+
+# create_all() skips tables that already exist, so also add any indexes
+# declared on the models after the database file was first created
+for table in models.Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+# Full-text index for item search
+search.setup_item_search(engine)
+
+# Reference counts for content-addressed uploads
+upload_store.setup_upload_refs(engine)
+
+# Change sequence for /api/sync
+change_feed.setup_change_feed(engine)
+
 app = FastAPI(
     title="Chemistry Lab Inventory API",
     description="Digital inventory catalog for chemistry laboratory items with admin control",
@@ -27,7 +51,8 @@ app.add_middleware(
 
 # Create uploads directory if it doesn't exist
 os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Uploads never change under the same name, so serve them as immutable
+app.mount("/uploads", ImmutableStaticFiles(directory="uploads"), name="uploads")
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
@@ -36,6 +61,8 @@ app.include_router(categories.router, prefix="/api/categories", tags=["categorie
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(borrowed.router, prefix="/api/borrowed", tags=["borrowed"])
 app.include_router(profile.router, prefix="/api/profile", tags=["profile"])  # Add profile router
+app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
+app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
 @app.get("/")
 async def root():
     return {"message": "Chemistry Lab Inventory System API"}
@@ -53,9 +80,40 @@ async def options_borrowed():
 async def test_cors():
     return {"message": "CORS is working!"}
 
+# Background jobs from scheduler.py, one scheduler per API process
+RUN_SCHEDULER = os.getenv("RUN_SCHEDULER", "true").lower() in ("1", "true", "yes")
+background_jobs = None
+
+def start_background_jobs():
+    global background_jobs
+    if not RUN_SCHEDULER or background_jobs is not None:
+        return
+    try:
+        from . import scheduler
+    except ImportError as e:
+        print(f"⚠️ Background jobs unavailable (pip install apscheduler): {e}")
+        return
+    scheduler.start_scheduler()
+    background_jobs = scheduler
+
+def stop_background_jobs():
+    if background_jobs is not None:
+        background_jobs.shutdown_scheduler()
+
 # Create default admin user on startup
 @app.on_event("startup")
 async def startup_event():
+    # Seeding hashes passwords, keep it off the event loop
+    await run_in_threadpool(create_default_users)
+    start_background_jobs()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_background_jobs()
+    # Wait so worker processes exit with the app instead of being orphaned
+    image_helper.shutdown_image_pool(wait=True)
+
+def create_default_users():
     db = next(get_db())
     try:
         # Check if admin user exists
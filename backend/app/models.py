@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, Text, Boolean, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
+from datetime import datetime
 import enum
 
 # Enum for borrow status - FIXED: Changed values to uppercase
@@ -29,10 +30,12 @@ class User(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    # Cascade delete configuration
-    items = relationship("Item", back_populates="created_by_user", cascade="all, delete-orphan")
-    borrowed_logs = relationship("BorrowLog", foreign_keys="[BorrowLog.user_id]", back_populates="user", cascade="all, delete-orphan")
-    admin_processed_logs = relationship("BorrowLog", foreign_keys="[BorrowLog.admin_id]", back_populates="admin", cascade="all, delete-orphan")
+    # Cascade delete configuration. Deletes are carried out by the database's
+    # ON DELETE CASCADE (foreign keys are enforced in database.py), so
+    # passive_deletes keeps the ORM from loading the children first.
+    items = relationship("Item", back_populates="created_by_user", cascade="all, delete-orphan", passive_deletes=True)
+    borrowed_logs = relationship("BorrowLog", foreign_keys="[BorrowLog.user_id]", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    admin_processed_logs = relationship("BorrowLog", foreign_keys="[BorrowLog.admin_id]", back_populates="admin", cascade="all, delete-orphan", passive_deletes=True)
 
 class Category(Base):
     __tablename__ = "categories"
@@ -42,8 +45,8 @@ class Category(Base):
     description = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    # Cascade delete configuration
-    items = relationship("Item", back_populates="category", cascade="all, delete-orphan")
+    # Cascade delete configuration (ON DELETE CASCADE, see User)
+    items = relationship("Item", back_populates="category", cascade="all, delete-orphan", passive_deletes=True)
 
 class Item(Base):
     __tablename__ = "items"
@@ -51,34 +54,46 @@ class Item(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False, index=True)
     description = Column(Text)
-    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False, index=True)
     quantity = Column(Integer, default=0)
     available_quantity = Column(Integer, default=0)
     unit = Column(String(20), default="pieces")
     storage_location = Column(String(100))
     image_url = Column(String(255))
     condition = Column(String(20), default="good")
+    # Condition the expiry sweep replaced with "expired", put back by the sweep
+    # if the expiry date is moved into the future (crud.update_expired_items)
+    condition_before_expiry = Column(String(20), nullable=True)
     min_stock_level = Column(Integer, default=5)
-    expiry_date = Column(DateTime, nullable=True)
+    # Indexed for the expiry sweep, expires_within_days and the dashboard counts
+    expiry_date = Column(DateTime, nullable=True, index=True)
     is_borrowable = Column(Boolean, default=True)
-    created_by = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     category = relationship("Category", back_populates="items")
     created_by_user = relationship("User", back_populates="items")
-    # Cascade delete configuration
-    borrow_logs = relationship("BorrowLog", back_populates="item", cascade="all, delete-orphan")
+    # Cascade delete configuration (ON DELETE CASCADE, see User)
+    borrow_logs = relationship("BorrowLog", back_populates="item", cascade="all, delete-orphan", passive_deletes=True)
+    forecast = relationship("ItemForecast", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
 
 class BorrowLog(Base):
     __tablename__ = "borrow_logs"
     
     id = Column(Integer, primary_key=True, index=True)
-    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    admin_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Indexed so cascading deletes find a parent's logs without a table scan
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    admin_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     quantity_borrowed = Column(Integer, nullable=False)
-    borrow_date = Column(DateTime(timezone=True), server_default=func.now())
+    # Category the item had when it was borrowed; the usage rollup files the
+    # log's borrow and return under it. NULL for logs written before the
+    # column existed, which fall back to the item's current category.
+    category_id = Column(Integer, nullable=True)
+    # Set in Python rather than by the server: SQLite's CURRENT_TIMESTAMP is
+    # UTC, while return dates and the overdue sweep use local time
+    borrow_date = Column(DateTime(timezone=True), default=datetime.now)
     expected_return_date = Column(DateTime(timezone=True))
     actual_return_date = Column(DateTime(timezone=True), nullable=True)
     status = Column(Enum(BorrowStatus), default=BorrowStatus.BORROWED)
@@ -87,4 +102,93 @@ class BorrowLog(Base):
     
     item = relationship("Item", back_populates="borrow_logs")
     user = relationship("User", foreign_keys=[user_id], back_populates="borrowed_logs")
-    admin = relationship("User", foreign_keys=[admin_id], back_populates="admin_processed_logs")
\ No newline at end of file
+    admin = relationship("User", foreign_keys=[admin_id], back_populates="admin_processed_logs")
+    
+    archived = False
+
+    __table_args__ = (
+        # Serves the overdue scan: status = 'BORROWED' AND expected_return_date < now
+        Index("ix_borrow_logs_status_expected_return", "status", "expected_return_date"),
+        # Ids are never handed out twice, so a new log can't take the id of
+        # one that was archived (existing databases: archive.setup_borrow_log_ids)
+        {"sqlite_autoincrement": True},
+    )
+
+class BorrowLogArchive(Base):
+    __tablename__ = "borrow_logs_archive"
+    
+    # Returned borrow logs moved out of borrow_logs by crud.archive_borrow_logs,
+    # keeping their ids. Same columns, so rows can be copied with INSERT ... SELECT.
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    admin_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    quantity_borrowed = Column(Integer, nullable=False)
+    category_id = Column(Integer, nullable=True)
+    borrow_date = Column(DateTime(timezone=True))
+    expected_return_date = Column(DateTime(timezone=True))
+    actual_return_date = Column(DateTime(timezone=True), nullable=True)
+    status = Column(Enum(BorrowStatus), default=BorrowStatus.RETURNED)
+    notes = Column(Text)
+    created_at = Column(DateTime(timezone=True))
+    
+    item = relationship("Item")
+    user = relationship("User", foreign_keys=[user_id])
+    admin = relationship("User", foreign_keys=[admin_id])
+    
+    archived = True
+
+class BorrowDailyRollup(Base):
+    __tablename__ = "borrow_daily_rollups"
+    
+    # One row per day x item x category with the borrows started and the
+    # returns made that day, maintained by crud. No foreign keys, so usage
+    # history outlives deleted items and categories.
+    day = Column(Date, primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    category_id = Column(Integer, primary_key=True)
+    borrowed_count = Column(Integer, default=0, nullable=False)
+    borrowed_quantity = Column(Integer, default=0, nullable=False)
+    returned_count = Column(Integer, default=0, nullable=False)
+    returned_quantity = Column(Integer, default=0, nullable=False)
+    
+    # Clustered on (day, ...) so a date range is one sequential scan
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class ItemForecast(Base):
+    __tablename__ = "item_forecasts"
+    
+    # Rewritten in bulk by forecasting.py from the borrow usage rollups
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    # Net units leaving stock per day (borrowed minus returned), recency weighted
+    daily_rate = Column(Float, nullable=False, default=0)
+    daily_rate_std = Column(Float, nullable=False, default=0)
+    # Stock level at which to reorder to cover the lead time's expected demand
+    reorder_point = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class SyncChange(Base):
+    __tablename__ = "sync_changes"
+
+    # Latest change to each item, category and borrow log, written by triggers
+    # (see change_feed.py). seq only grows, so "changed since seq N" is one
+    # index range; deleted rows stay as tombstones.
+    entity = Column(String(20), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    seq = Column(Integer, nullable=False, unique=True, index=True)
+    deleted = Column(Boolean, default=False, nullable=False)
+    # Borrower of a borrow log, so users only receive their own logs' changes
+    user_id = Column(Integer, nullable=True)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+class UploadBlob(Base):
+    __tablename__ = "upload_blobs"
+    
+    # Path under the uploads directory, e.g. "ab/cd/abcd...png"
+    path = Column(String(255), primary_key=True)
+    # Number of items.image_url / users.profile_picture values pointing at it,
+    # maintained by triggers (see upload_store.py)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session
 from datetime import timedelta
 from ..database import get_db
 from .. import schemas, crud
-from ..auth import authenticate_user, create_access_token, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
+from ..auth import authenticate_user_async, create_access_token, get_current_user, get_current_admin, get_auth_cache_stats, ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter()
 
@@ -12,7 +12,7 @@ router = APIRouter()
 async def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db)):
     print(f"Login attempt for user: {login_data.username}")  # Debug log
     
-    user = authenticate_user(db, login_data.username, login_data.password)
+    user = await authenticate_user_async(db, login_data.username, login_data.password)
     if not user:
         print("Authentication failed: Incorrect username or password")
         raise HTTPException(
@@ -54,4 +54,8 @@ async def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db))
     }
 @router.get("/me")
 async def read_users_me(current_user: schemas.User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+    return current_user
+
+@router.get("/cache-stats")
+async def read_auth_cache_stats(current_admin: schemas.User = Depends(get_current_admin)):
+    return get_auth_cache_stats()
\ No newline at end of file
@@ -1,23 +1,25 @@
 #borrowed.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import datetime
-from ..database import get_db
-from .. import models, schemas, crud
+from ..database import get_db, get_read_db
+from .. import models, schemas, crud, crud_async
 from ..auth import get_current_admin, get_current_user
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.BorrowLogWithDetails])
-def read_borrow_logs(
+async def read_borrow_logs(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None),
     user_id: Optional[str] = Query(None),  # Change to string and convert later
     item_id: Optional[str] = Query(None),  # Change to string and convert later
     status: Optional[str] = Query(None),
     overdue_only: Optional[bool] = Query(False),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
     # Convert string parameters to integers if provided
@@ -36,19 +38,31 @@ def read_borrow_logs(
         except (ValueError, TypeError):
             raise HTTPException(status_code=400, detail="Invalid item_id format")
     
+    after_id = None
+    if cursor:
+        try:
+            after_id = crud.decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     # Only admin can see all logs, users can only see their own
     if current_user.role != "admin":
         user_id_int = current_user.id
     
-    borrow_logs = crud.get_borrow_logs(
+    borrow_logs = await crud_async.get_borrow_logs(
         db,
         skip=skip,
         limit=limit,
         user_id=user_id_int,
         item_id=item_id_int,
         status=status,
-        overdue_only=overdue_only
+        overdue_only=overdue_only,
+        after_id=after_id
     )
+    
+    next_cursor = crud.next_cursor(borrow_logs, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return borrow_logs
 
 @router.get("/{borrow_log_id}", response_model=schemas.BorrowLogWithDetails)
@@ -57,7 +71,7 @@ def read_borrow_log(
     db: Session = Depends(get_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    db_borrow_log = crud.get_borrow_log(db, borrow_log_id=borrow_log_id)
+    db_borrow_log = crud.get_borrow_log(db, borrow_log_id=borrow_log_id, include_archive=True)
     if db_borrow_log is None:
         raise HTTPException(status_code=404, detail="Borrow log not found")
     
@@ -79,6 +93,40 @@ def create_borrow_log(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/batch", response_model=schemas.BorrowBatchResult, response_model_exclude_none=True)
+def create_borrow_logs_batch(
+    batch: schemas.BorrowBatchCreate,
+    db: Session = Depends(get_db),
+    current_admin: schemas.User = Depends(get_current_admin)
+):
+    borrow_logs, errors = crud.create_borrow_logs_batch(
+        db,
+        batch.lines,
+        admin_id=current_admin.id,
+        expected_return_date=batch.expected_return_date,
+        notes=batch.notes,
+        all_or_nothing=batch.all_or_nothing
+    )
+    if errors and not borrow_logs:
+        raise HTTPException(status_code=400, detail={"message": "No items were borrowed", "errors": errors})
+    return {"borrow_logs": borrow_logs, "errors": errors}
+
+@router.post("/return-batch", response_model=schemas.BorrowBatchResult, response_model_exclude_none=True)
+def return_borrow_logs_batch(
+    batch: schemas.BorrowReturnBatch,
+    db: Session = Depends(get_db),
+    current_admin: schemas.User = Depends(get_current_admin)
+):
+    borrow_logs, errors = crud.return_borrow_logs_batch(
+        db,
+        batch.borrow_log_ids,
+        notes=batch.notes,
+        all_or_nothing=batch.all_or_nothing
+    )
+    if errors and not borrow_logs:
+        raise HTTPException(status_code=400, detail={"message": "No items were returned", "errors": errors})
+    return {"borrow_logs": borrow_logs, "errors": errors}
+
 @router.put("/{borrow_log_id}", response_model=schemas.BorrowLog)
 def update_borrow_log(
     borrow_log_id: int,
@@ -1,27 +1,46 @@
 #routes/items.py
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response
 from sqlalchemy.orm import Session
 from typing import Optional, List
 import json
-from ..database import get_db
-from .. import models, schemas, crud
-from ..utils.image_helper import save_upload_file
+from ..database import get_db, get_read_db
+from .. import models, schemas, crud, crud_async
+from ..auth import get_current_admin
+from ..utils.image_helper import save_upload_file, apply_image_size
+from ..utils.item_import import import_format, iter_import_rows
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.ItemWithDetails])
-def read_items(
+async def read_items(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
     category_id: Optional[int] = Query(None),
     storage_location: Optional[str] = Query(None),
     condition: Optional[str] = Query(None),
     low_stock: Optional[bool] = Query(None),
     borrowable_only: Optional[bool] = Query(None),  # Added missing parameter
-    db: Session = Depends(get_db)
+    expires_within_days: Optional[int] = Query(None, ge=0),
+    stockout_within_days: Optional[float] = Query(None, ge=0),
+    below_reorder_point: Optional[bool] = Query(None),
+    sort: Optional[str] = Query(None, pattern="^(stockout)$"),
+    image_size: Optional[int] = Query(None, ge=1),
+    image_format: Optional[str] = Query(None, pattern="^(original|webp)$"),
+    db: Session = Depends(get_read_db)
 ):
-    items = crud.get_items(
+    after_id = None
+    if cursor:
+        if sort:
+            raise HTTPException(status_code=400, detail="cursor pagination is not available with sort")
+        try:
+            after_id = crud.decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    items = await crud_async.get_items(
         db, 
         skip=skip, 
         limit=limit,
@@ -30,15 +49,42 @@ def read_items(
         storage_location=storage_location,
         condition=condition,
         low_stock=low_stock,
-        borrowable_only=borrowable_only  # Pass the parameter
+        borrowable_only=borrowable_only,  # Pass the parameter
+        after_id=after_id,
+        expires_within_days=expires_within_days,
+        stockout_within_days=stockout_within_days,
+        below_reorder_point=below_reorder_point,
+        sort=sort
     )
+    
+    # Ranked search and sorted pages are not in id order, so only offer a cursor for id-ordered pages
+    next_cursor = crud.next_cursor(items, limit) if (not search or cursor) and not sort else None
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    # Let list pages ask for a thumbnail-sized rendition instead of the full image
+    if image_size is not None or image_format is not None:
+        items = apply_image_size(
+            [schemas.ItemWithDetails.model_validate(item) for item in items],
+            "image_url", "image_renditions", image_size, image_format
+        )
     return items
 
 @router.get("/{item_id}", response_model=schemas.ItemWithDetails)
-def read_item(item_id: int, db: Session = Depends(get_db)):
+def read_item(
+    item_id: int,
+    image_size: Optional[int] = Query(None, ge=1),
+    image_format: Optional[str] = Query(None, pattern="^(original|webp)$"),
+    db: Session = Depends(get_db)
+):
     db_item = crud.get_item(db, item_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
+    if image_size is not None or image_format is not None:
+        db_item = apply_image_size(
+            [schemas.ItemWithDetails.model_validate(db_item)],
+            "image_url", "image_renditions", image_size, image_format
+        )[0]
     return db_item
 @router.post("/", response_model=schemas.Item)
 async def create_item(
@@ -85,9 +131,32 @@ async def create_item(
     if image_url:
         item_data["image_url"] = image_url
     
-    db_item = crud.create_item(db=db, item=schemas.ItemCreate(**item_data))
+    try:
+        db_item = crud.create_item(db=db, item=schemas.ItemCreate(**item_data))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return db_item
 
+@router.post("/import", response_model=schemas.ItemImportResult)
+def import_items(
+    file: UploadFile = File(...),
+    create_categories: bool = Form(False),
+    db: Session = Depends(get_db),
+    current_admin: schemas.User = Depends(get_current_admin)
+):
+    # CSV needs a header row; columns match the item fields, with the category
+    # given as `category` (name) or `category_id`
+    file_format = import_format(file.filename)
+    if file_format is None:
+        raise HTTPException(status_code=400, detail="File type not allowed. Allowed types: csv, jsonl")
+    
+    return crud.import_items(
+        db,
+        iter_import_rows(file.file, file_format),
+        created_by=current_admin.id,
+        create_categories=create_categories
+    )
+
 @router.put("/{item_id}", response_model=schemas.Item)
 async def update_item(
     item_id: int,
@@ -135,7 +204,10 @@ async def update_item(
     if expiry_date is not None: update_data["expiry_date"] = expiry_date_obj
     if image_url is not None: update_data["image_url"] = image_url
     
-    db_item = crud.update_item(db=db, item_id=item_id, item_update=schemas.ItemUpdate(**update_data))
+    try:
+        db_item = crud.update_item(db=db, item_id=item_id, item_update=schemas.ItemUpdate(**update_data))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return db_item
 
 @router.delete("/{item_id}")
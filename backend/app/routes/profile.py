@@ -1,19 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 import os
 from ..database import get_db
 from .. import schemas, crud, models
 from ..auth import get_current_user, get_current_admin
-from ..utils.image_helper import save_upload_file
+from ..utils.image_helper import save_upload_file, apply_image_size
 
 router = APIRouter()
 
 # Get current user's profile
 @router.get("/me", response_model=schemas.User)
 async def get_my_profile(
+    image_size: Optional[int] = Query(None, ge=1),
+    image_format: Optional[str] = Query(None, pattern="^(original|webp)$"),
     current_user: models.User = Depends(get_current_user)
 ):
+    if image_size is not None or image_format is not None:
+        return apply_image_size(
+            [schemas.User.model_validate(current_user)],
+            "profile_picture", "profile_picture_renditions", image_size, image_format
+        )[0]
     return current_user
 
 # Update current user's profile (users can update their own profile fields)
@@ -52,6 +59,9 @@ async def upload_profile_picture(
         
         return {"profile_picture_url": profile_picture_url, "message": "Profile picture updated successfully"}
     
+    except HTTPException:
+        # Keep the upload's own status (e.g. 503 when image processing is busy)
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -97,6 +107,9 @@ async def upload_user_profile_picture(
         
         return {"profile_picture_url": profile_picture_url, "message": "Profile picture updated successfully"}
     
+    except HTTPException:
+        # Keep the upload's own status (e.g. 503 when image processing is busy)
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
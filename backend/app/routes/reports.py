@@ -0,0 +1,117 @@
+#routes/reports.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date, timedelta
+from ..database import SessionLocal, get_db
+from .. import schemas, crud
+from ..auth import get_current_user
+from ..utils.export import stream_csv, stream_xlsx, xlsx_available
+
+router = APIRouter()
+
+INVENTORY_HEADERS = ["Name", "Category", "Quantity", "Available", "Unit", "Location", "Condition", "Status"]
+EXPIRED_HEADERS = ["Name", "Category", "Quantity", "Unit", "Location", "Expiry Date"]
+BORROWED_HEADERS = ["Item", "User", "Quantity", "Borrow Date", "Expected Return", "Returned", "Status"]
+
+def report_rows(statement):
+    # The rows are produced while the response streams, after the request's
+    # dependencies are done, so the report owns its session
+    db = SessionLocal()
+    try:
+        yield from crud.stream_report_rows(db, statement)
+    finally:
+        db.close()
+
+def report_response(name: str, headers, statement, export_format: str, start_date: Optional[date], end_date: Optional[date]):
+    rows = report_rows(statement) if statement is not None else iter(())
+    suffix = "".join(f"-{d.isoformat()}" for d in (start_date, end_date) if d)
+    filename = f"{name}-report{suffix}.{export_format}"
+    response_headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Cache-Control": "no-store",
+    }
+
+    if export_format == "xlsx":
+        if not xlsx_available():
+            raise HTTPException(status_code=501, detail="XLSX export requires openpyxl to be installed")
+        return StreamingResponse(
+            stream_xlsx(headers, rows, sheet_title=name.title()),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers=response_headers
+        )
+
+    return StreamingResponse(
+        stream_csv(headers, rows),
+        media_type="text/csv",
+        headers=response_headers
+    )
+
+@router.get("/inventory")
+def export_inventory_report(
+    low_stock: Optional[bool] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    statement = crud.inventory_report_statement(low_stock=low_stock, start_date=start_date, end_date=end_date)
+    return report_response("inventory", INVENTORY_HEADERS, statement, export_format, start_date, end_date)
+
+@router.get("/expired")
+def export_expired_report(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    statement = crud.expired_report_statement(start_date=start_date, end_date=end_date)
+    return report_response("expired-items", EXPIRED_HEADERS, statement, export_format, start_date, end_date)
+
+@router.get("/borrowed")
+def export_borrowed_report(
+    status: Optional[str] = Query(None),
+    overdue_only: Optional[bool] = Query(False),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    # Only admin can export all logs, users only get their own
+    user_id = None if current_user.role == "admin" else current_user.id
+    statement = crud.borrowed_report_statement(
+        user_id=user_id,
+        status=status,
+        overdue_only=overdue_only,
+        start_date=start_date,
+        end_date=end_date
+    )
+    return report_response("borrowed-items", BORROWED_HEADERS, statement, export_format, start_date, end_date)
+
+@router.get("/usage", response_model=schemas.UsageReport, response_model_exclude_none=True)
+def read_usage_report(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    group_by: str = Query("day,category", description="Comma-separated: day, category, item"),
+    category_id: Optional[int] = Query(None),
+    item_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    # Defaults to the last 30 days
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=29)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    
+    groups = [group.strip() for group in group_by.split(",") if group.strip()]
+    invalid = [group for group in groups if group not in crud.USAGE_GROUP_COLUMNS]
+    if invalid or len(set(groups)) != len(groups):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid group_by. Use any of: {', '.join(crud.USAGE_GROUP_COLUMNS)}"
+        )
+    
+    rows = crud.get_usage(db, start_date, end_date, groups, category_id=category_id, item_id=item_id)
+    return {"start_date": start_date, "end_date": end_date, "group_by": groups, "rows": rows}
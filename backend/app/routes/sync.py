@@ -0,0 +1,23 @@
+#routes/sync.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from ..database import get_db
+from .. import schemas, crud, change_feed
+from ..auth import get_current_user
+
+router = APIRouter()
+
+@router.get("", response_model=schemas.SyncChanges)
+def read_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(crud.SYNC_PAGE_SIZE, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    # since=0 returns everything; then pass next_since back until has_more is false
+    if not change_feed.feed_enabled:
+        raise HTTPException(status_code=501, detail="Sync requires SQLite 3.24 or newer")
+
+    # Only admin gets every borrow log, users only get their own
+    user_id = None if current_user.role == "admin" else current_user.id
+    return crud.get_changes(db, since=since, limit=limit, user_id=user_id)
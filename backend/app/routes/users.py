@@ -1,20 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
-from .. import schemas, crud
+from typing import List, Optional
+from ..database import get_db, get_read_db
+from .. import schemas, crud, crud_async
 from ..auth import get_current_admin, get_current_user
+from ..utils.image_helper import apply_image_size
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.User])
 def read_users(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = Query(None),
+    image_size: Optional[int] = Query(None, ge=1),
+    image_format: Optional[str] = Query(None, pattern="^(original|webp)$"),
     db: Session = Depends(get_db),
     current_admin: schemas.User = Depends(get_current_admin)
 ):
-    users = crud.get_users(db, skip=skip, limit=limit)
+    after_id = None
+    if cursor:
+        try:
+            after_id = crud.decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    users = crud.get_users(db, skip=skip, limit=limit, after_id=after_id)
+    
+    next_cursor = crud.next_cursor(users, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    # Avatars in the user table only need a small rendition
+    if image_size is not None or image_format is not None:
+        users = apply_image_size(
+            [schemas.User.model_validate(user) for user in users],
+            "profile_picture", "profile_picture_renditions", image_size, image_format
+        )
     return users
 
 @router.get("/{user_id}", response_model=schemas.User)
@@ -79,11 +102,11 @@ def delete_user(
     return {"message": "User deleted successfully"}
 # Dashboard route - accessible to all authenticated users
 @router.get("/dashboard/stats")
-def get_dashboard_stats(
-    db: Session = Depends(get_db),
+async def get_dashboard_stats(
+    db: Session = Depends(get_read_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    return crud.get_dashboard_stats(
+    return await crud_async.get_dashboard_stats(
         db, 
         user_id=current_user.id, 
         user_role=current_user.role
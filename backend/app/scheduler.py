@@ -1,7 +1,10 @@
 # scheduler.py
+# Background jobs: overdue and expiry sweeps, usage forecasts and borrow log
+# archiving. Set RUN_SCHEDULER=false to run them some other way (e.g. cron
+# with the app.forecasting / app.archive commands) instead.
 from apscheduler.schedulers.background import BackgroundScheduler
 from .database import SessionLocal
-from . import crud
+from . import crud, forecasting
 
 def check_overdue_items():
     db = SessionLocal()
@@ -11,6 +14,42 @@ def check_overdue_items():
     finally:
         db.close()
 
+def check_expired_items():
+    db = SessionLocal()
+    try:
+        expired, restored, expiring_soon = crud.update_expired_items(db)
+        print(f"Marked {expired} items expired, restored {restored}, {expiring_soon} expiring soon")
+    finally:
+        db.close()
+
+def archive_returned_borrows():
+    db = SessionLocal()
+    try:
+        count = crud.archive_borrow_logs(db)
+        print(f"Archived {count} returned borrow logs")
+    finally:
+        db.close()
+
+def refresh_item_forecasts():
+    db = SessionLocal()
+    try:
+        count = forecasting.compute_item_forecasts(db)
+        print(f"Updated forecasts for {count} items")
+    finally:
+        db.close()
+
+# Started from main.py's startup event, in every API process
 scheduler = BackgroundScheduler()
 scheduler.add_job(check_overdue_items, 'interval', hours=1)  # Run every hour
-scheduler.start()
\ No newline at end of file
+scheduler.add_job(check_expired_items, 'interval', hours=1)
+scheduler.add_job(refresh_item_forecasts, 'interval', hours=6)  # Usage rollups change slowly
+scheduler.add_job(archive_returned_borrows, 'interval', hours=24)
+
+def start_scheduler():
+    # Once per process, however many times startup runs
+    if not scheduler.running:
+        scheduler.start()
+
+def shutdown_scheduler():
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
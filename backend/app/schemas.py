@@ -1,9 +1,10 @@
 
 #schemas.py
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from typing import Optional, List, Dict
+from datetime import date, datetime
 from enum import Enum
+from .utils.image_helper import image_renditions
 
 # Borrow Status Enum
 class BorrowStatus(str, Enum):
@@ -51,6 +52,15 @@ class User(UserBase):
     phone_number: Optional[str] = None
     course: Optional[str] = None
 
+    # {"64": {"original": ..., "webp": ...}, ...} for pictures with renditions
+    profile_picture_renditions: Optional[Dict[str, Dict[str, str]]] = None
+    
+    @model_validator(mode="after")
+    def fill_profile_picture_renditions(self):
+        if self.profile_picture_renditions is None:
+            self.profile_picture_renditions = image_renditions(self.profile_picture)
+        return self
+    
     class Config:
         from_attributes = True
 
@@ -124,6 +134,42 @@ class ItemCreate(BaseModel):
     image_url: Optional[str] = None
 
 
+# Bulk import: one CSV/JSONL row; the category is given by name or id
+class ItemImportRow(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    description: Optional[str] = None
+    category: Optional[str] = Field(None, max_length=50)
+    category_id: Optional[int] = None
+    quantity: int = Field(0, ge=0)
+    unit: str = "pieces"
+    storage_location: Optional[str] = None
+    condition: str = "good"
+    min_stock_level: int = Field(5, ge=0)
+    expiry_date: Optional[datetime] = None
+    is_borrowable: bool = True
+    
+    @field_validator("expiry_date", mode="before")
+    @classmethod
+    def parse_expiry_date(cls, value):
+        # Parsed like the item form's expiry date, so plain dates are accepted
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                pass
+        return value
+
+class ItemImportError(BaseModel):
+    row: int
+    error: str
+
+class ItemImportResult(BaseModel):
+    created: int
+    failed: int
+    categories_created: int = 0
+    # Capped at crud.IMPORT_MAX_ERRORS; `failed` has the full count
+    errors: List[ItemImportError] = []
+
 class ItemUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -145,12 +191,39 @@ class Item(ItemBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
+    # {"64": {"original": ..., "webp": ...}, ...} for images with renditions
+    image_renditions: Optional[Dict[str, Dict[str, str]]] = None
+    
+    @model_validator(mode="after")
+    def fill_image_renditions(self):
+        if self.image_renditions is None:
+            self.image_renditions = image_renditions(self.image_url)
+        return self
+    
+    class Config:
+        from_attributes = True
+
+class ItemForecast(BaseModel):
+    daily_rate: float
+    daily_rate_std: float
+    reorder_point: int
+    computed_at: Optional[datetime] = None
+    
     class Config:
         from_attributes = True
 
 class ItemWithDetails(Item):
     category: Optional['Category'] = None
     created_by_user: Optional['User'] = None
+    forecast: Optional[ItemForecast] = None
+    # available_quantity / forecast.daily_rate; None if stock isn't being used up
+    days_until_stockout: Optional[float] = None
+    
+    @model_validator(mode="after")
+    def fill_days_until_stockout(self):
+        if self.days_until_stockout is None and self.forecast and self.forecast.daily_rate > 0:
+            self.days_until_stockout = round(self.available_quantity / self.forecast.daily_rate, 1)
+        return self
 # Borrow Log Schemas
 class BorrowLogBase(BaseModel):
     item_id: int
@@ -176,6 +249,8 @@ class BorrowLog(BorrowLogBase):
     actual_return_date: Optional[datetime] = None
     status: BorrowStatus
     created_at: datetime
+    # True for returned logs moved to the archive table
+    archived: bool = False
     
     class Config:
         from_attributes = True
@@ -185,6 +260,51 @@ class BorrowLogWithDetails(BorrowLog):
     user: Optional[User] = None
     admin: Optional[User] = None
 
+# Batch borrow/return: all lines in one transaction. With all_or_nothing any
+# failing line aborts the batch, otherwise the valid lines are still recorded.
+class BorrowBatchLine(BaseModel):
+    item_id: int
+    user_id: int
+    quantity_borrowed: int = Field(..., gt=0)
+    # Falls back to the batch's expected_return_date / notes
+    expected_return_date: Optional[datetime] = None
+    notes: Optional[str] = None
+
+class BorrowBatchCreate(BaseModel):
+    lines: List[BorrowBatchLine] = Field(..., min_length=1, max_length=500)
+    expected_return_date: Optional[datetime] = None
+    notes: Optional[str] = None
+    all_or_nothing: bool = True
+
+class BorrowReturnBatch(BaseModel):
+    borrow_log_ids: List[int] = Field(..., min_length=1, max_length=500)
+    notes: Optional[str] = None
+    all_or_nothing: bool = True
+
+class BatchLineError(BaseModel):
+    index: int
+    borrow_log_id: Optional[int] = None
+    error: str
+
+class BorrowBatchResult(BaseModel):
+    borrow_logs: List[BorrowLog] = []
+    errors: List[BatchLineError] = []
+
+# Delta sync: rows changed since a seq, plus ids deleted since then
+class SyncChanges(BaseModel):
+    # Pass back as ?since= on the next call
+    next_since: int
+    has_more: bool = False
+    # The token is ahead of this database (e.g. restored from a backup), so
+    # the client should drop its cache and sync again from 0
+    reset: bool = False
+    items: List[Item] = []
+    categories: List[Category] = []
+    borrow_logs: List[BorrowLog] = []
+    deleted_items: List[int] = []
+    deleted_categories: List[int] = []
+    deleted_borrow_logs: List[int] = []
+
 # Authentication Schemas
 class Token(BaseModel):
     access_token: str
@@ -208,4 +328,22 @@ class DashboardStats(BaseModel):
     items_for_disposal: int
     total_borrowed_items: int
     overdue_borrows: int
-    total_users: int
\ No newline at end of file
+    total_users: int
+    expiring_soon_items: int = 0
+# Usage report (served from the daily borrow rollups)
+class UsageRow(BaseModel):
+    day: Optional[date] = None
+    category_id: Optional[int] = None
+    category_name: Optional[str] = None
+    item_id: Optional[int] = None
+    item_name: Optional[str] = None
+    borrowed_count: int
+    borrowed_quantity: int
+    returned_count: int
+    returned_quantity: int
+
+class UsageReport(BaseModel):
+    start_date: date
+    end_date: date
+    group_by: List[str]
+    rows: List[UsageRow]
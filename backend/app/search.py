@@ -0,0 +1,112 @@
+# search.py
+import os
+import re
+from sqlalchemy import text, table, column, or_
+from sqlalchemy.exc import OperationalError
+from . import models
+
+# External-content FTS5 index over items.name/description, kept in sync by
+# triggers so every write path (ORM, bulk inserts, cascaded deletes) is covered
+ITEMS_FTS_TABLE = "items_fts"
+
+ITEMS_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {ITEMS_FTS_TABLE} USING fts5(
+        name, description,
+        content='items', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+        INSERT INTO {ITEMS_FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+        INSERT INTO {ITEMS_FTS_TABLE}({ITEMS_FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF name, description ON items BEGIN
+        INSERT INTO {ITEMS_FTS_TABLE}({ITEMS_FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {ITEMS_FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+items_fts = table(ITEMS_FTS_TABLE, column("rowid"), column("rank"), column(ITEMS_FTS_TABLE))
+
+# bm25 ranking scores every matching row, so broad prefixes (one or two typed
+# letters) that match more rows than this are returned in index order instead
+RANKED_SEARCH_MAX_MATCHES = int(os.getenv("RANKED_SEARCH_MAX_MATCHES", "2000"))
+
+# Set by setup_item_search(); crud falls back to ILIKE while this is False
+fts_enabled = False
+
+def setup_item_search(engine):
+    """Create the FTS index and triggers if missing; returns whether FTS is usable"""
+    global fts_enabled
+    if engine.dialect.name != "sqlite":
+        fts_enabled = False
+        return fts_enabled
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                {"name": ITEMS_FTS_TABLE}
+            ).first()
+            for statement in ITEMS_FTS_DDL:
+                conn.execute(text(statement))
+            # Index rows that were written before the FTS table existed
+            if not exists:
+                conn.execute(text(
+                    f"INSERT INTO {ITEMS_FTS_TABLE}({ITEMS_FTS_TABLE}) VALUES ('rebuild')"
+                ))
+        fts_enabled = True
+    except OperationalError as e:
+        # SQLite build without FTS5
+        print(f"⚠️ Full-text search unavailable, falling back to LIKE search: {e}")
+        fts_enabled = False
+    return fts_enabled
+
+def build_match_query(search: str) -> str:
+    """Turn free text into an FTS5 query: every token must match as a prefix"""
+    tokens = re.findall(r"\w+", search)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+def apply_item_search(query, search: str, ranked: bool = False):
+    """Filter an Item select/query by search text, ordered by relevance if ranked.
+
+    Returns the query and the id column to page and order on; for FTS matches
+    that is the index rowid, which lets SQLite walk the match in id order.
+    """
+    match = build_match_query(search) if fts_enabled else ""
+    if not match:
+        query = query.filter(
+            or_(
+                models.Item.name.ilike(f"%{search}%"),
+                models.Item.description.ilike(f"%{search}%")
+            )
+        )
+        return query, models.Item.id
+
+    query = query.join(
+        items_fts, items_fts.c.rowid == models.Item.id
+    ).filter(
+        items_fts.c[ITEMS_FTS_TABLE].op("MATCH")(match)
+    )
+    if ranked:
+        query = query.order_by(items_fts.c.rank)
+    return query, items_fts.c.rowid
+
+def match_count_statement(search: str):
+    """FTS hit count for search, capped just past the ranking limit; None without FTS"""
+    match = build_match_query(search) if fts_enabled else ""
+    if not match:
+        return None
+    return text(
+        f"SELECT count(*) FROM (SELECT 1 FROM {ITEMS_FTS_TABLE} "
+        f"WHERE {ITEMS_FTS_TABLE} MATCH :match LIMIT :cap)"
+    ).bindparams(match=match, cap=RANKED_SEARCH_MAX_MATCHES + 1)
+
+def within_ranking_limit(match_count: int) -> bool:
+    return match_count <= RANKED_SEARCH_MAX_MATCHES
@@ -0,0 +1,192 @@
+# upload_store.py
+# Reference counts for stored uploads and the sweep that removes orphaned files.
+#
+#   python -m app.upload_store sweep [--grace-hours 24] [--recount] [--dry-run]
+#
+# Run it from the backend directory (same working directory as the API) so
+# the database and uploads paths resolve the same way.
+import argparse
+import os
+import re
+import time
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from .database import engine
+from . import models
+from .utils.image_helper import UPLOAD_DIR, IMAGE_RENDITION_SIZES
+
+# Profile pictures are stored as "/uploads/<path>", item images as "<path>"
+def _profile_path(column: str) -> str:
+    prefix = f"/{UPLOAD_DIR}/"
+    return f"CASE WHEN {column} LIKE '{prefix}%' THEN substr({column}, {len(prefix) + 1}) ELSE {column} END"
+
+def _retain(path: str) -> str:
+    return f"""INSERT INTO upload_blobs(path, ref_count) VALUES ({path}, 1)
+        ON CONFLICT(path) DO UPDATE SET ref_count = ref_count + 1;"""
+
+def _release(path: str) -> str:
+    return f"UPDATE upload_blobs SET ref_count = ref_count - 1 WHERE path = {path};"
+
+# Triggers keep upload_blobs.ref_count in step with every write path,
+# including rows removed by cascaded deletes that never pass through crud
+UPLOAD_REF_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS items_image_ref_ai AFTER INSERT ON items
+        WHEN new.image_url IS NOT NULL BEGIN
+        {_retain("new.image_url")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_image_ref_ad AFTER DELETE ON items
+        WHEN old.image_url IS NOT NULL BEGIN
+        {_release("old.image_url")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_image_ref_au_old AFTER UPDATE OF image_url ON items
+        WHEN old.image_url IS NOT NULL AND old.image_url IS NOT new.image_url BEGIN
+        {_release("old.image_url")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_image_ref_au_new AFTER UPDATE OF image_url ON items
+        WHEN new.image_url IS NOT NULL AND old.image_url IS NOT new.image_url BEGIN
+        {_retain("new.image_url")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_picture_ref_ai AFTER INSERT ON users
+        WHEN new.profile_picture IS NOT NULL BEGIN
+        {_retain(_profile_path("new.profile_picture"))}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_picture_ref_ad AFTER DELETE ON users
+        WHEN old.profile_picture IS NOT NULL BEGIN
+        {_release(_profile_path("old.profile_picture"))}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_picture_ref_au_old AFTER UPDATE OF profile_picture ON users
+        WHEN old.profile_picture IS NOT NULL AND old.profile_picture IS NOT new.profile_picture BEGIN
+        {_release(_profile_path("old.profile_picture"))}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_picture_ref_au_new AFTER UPDATE OF profile_picture ON users
+        WHEN new.profile_picture IS NOT NULL AND old.profile_picture IS NOT new.profile_picture BEGIN
+        {_retain(_profile_path("new.profile_picture"))}
+    END""",
+]
+
+RECOUNT_STATEMENTS = [
+    "UPDATE upload_blobs SET ref_count = 0",
+    f"""INSERT INTO upload_blobs(path, ref_count)
+        SELECT path, count(*) FROM (
+            SELECT image_url AS path FROM items WHERE image_url IS NOT NULL
+            UNION ALL
+            SELECT {_profile_path("profile_picture")} FROM users WHERE profile_picture IS NOT NULL
+        ) WHERE true GROUP BY path
+        ON CONFLICT(path) DO UPDATE SET ref_count = excluded.ref_count""",
+]
+
+# Set by setup_upload_refs(); the sweep refuses to run without reference counts
+refs_enabled = False
+
+def setup_upload_refs(engine):
+    """Create the reference-count triggers if missing, counting existing rows once"""
+    global refs_enabled
+    if engine.dialect.name != "sqlite":
+        refs_enabled = False
+        return refs_enabled
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'items_image_ref_ai'")
+            ).first()
+            for statement in UPLOAD_REF_TRIGGERS:
+                conn.execute(text(statement))
+            # Count references written before the triggers existed
+            if not exists:
+                for statement in RECOUNT_STATEMENTS:
+                    conn.execute(text(statement))
+        refs_enabled = True
+    except OperationalError as e:
+        # SQLite older than 3.24 has no upsert
+        print(f"⚠️ Upload reference counting unavailable: {e}")
+        refs_enabled = False
+    return refs_enabled
+
+def recount_upload_refs(engine):
+    """Rebuild every ref_count from the items/users columns"""
+    with engine.begin() as conn:
+        for statement in RECOUNT_STATEMENTS:
+            conn.execute(text(statement))
+
+# "<stem>_<width>.<ext>" renditions belong to the upload "<stem>.<ext>"
+RENDITION_SUFFIX = re.compile(r"_(%s)$" % "|".join(str(w) for w in IMAGE_RENDITION_SIZES))
+
+def upload_stem(relative_path: str) -> str:
+    stem = relative_path.split(".", 1)[0]
+    return RENDITION_SUFFIX.sub("", stem)
+
+def sweep_orphaned_uploads(engine, grace_seconds: float = 24 * 3600, dry_run: bool = False) -> dict:
+    """Delete upload files (with their renditions) that nothing references.
+
+    Files younger than grace_seconds are kept: an upload is written before the
+    item or user row that points at it is committed."""
+    with engine.connect() as conn:
+        referenced = {
+            upload_stem(path)
+            for (path,) in conn.execute(text("SELECT path FROM upload_blobs WHERE ref_count > 0"))
+        }
+
+    cutoff = time.time() - grace_seconds
+    removed_files = 0
+    removed_bytes = 0
+    for root, dirs, files in os.walk(UPLOAD_DIR, topdown=False):
+        for name in files:
+            file_path = os.path.join(root, name)
+            relative_path = os.path.relpath(file_path, UPLOAD_DIR).replace(os.sep, "/")
+            # Leftover temp files from interrupted writes are always fair game
+            if not name.endswith(".tmp") and upload_stem(relative_path) in referenced:
+                continue
+            try:
+                stat = os.stat(file_path)
+                if stat.st_mtime > cutoff:
+                    continue
+                if not dry_run:
+                    os.remove(file_path)
+            except FileNotFoundError:
+                continue
+            removed_files += 1
+            removed_bytes += stat.st_size
+        # Drop emptied shard directories, never the uploads directory itself
+        if root != UPLOAD_DIR and not dry_run:
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+    if not dry_run:
+        # Forget blobs that are unreferenced and no longer on disk
+        with engine.begin() as conn:
+            stale = [
+                path
+                for (path,) in conn.execute(text("SELECT path FROM upload_blobs WHERE ref_count <= 0"))
+                if not os.path.exists(os.path.join(UPLOAD_DIR, path))
+            ]
+            for path in stale:
+                conn.execute(
+                    text("DELETE FROM upload_blobs WHERE path = :path AND ref_count <= 0"),
+                    {"path": path}
+                )
+
+    return {"removed_files": removed_files, "removed_bytes": removed_bytes, "dry_run": dry_run}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the uploads directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sweep = subparsers.add_parser("sweep", help="Remove uploaded files nothing references")
+    sweep.add_argument("--grace-hours", type=float, default=24, help="Keep files younger than this")
+    sweep.add_argument("--recount", action="store_true", help="Rebuild reference counts first")
+    sweep.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    args = parser.parse_args(argv)
+
+    models.UploadBlob.__table__.create(bind=engine, checkfirst=True)
+    if not setup_upload_refs(engine):
+        raise SystemExit("Upload reference counts are unavailable for this database")
+    if args.recount:
+        recount_upload_refs(engine)
+    result = sweep_orphaned_uploads(engine, grace_seconds=args.grace_hours * 3600, dry_run=args.dry_run)
+    action = "Would remove" if args.dry_run else "Removed"
+    print(f"{action} {result['removed_files']} files ({result['removed_bytes']} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# usage.py
+# Maintenance for the daily borrow usage rollups behind /api/reports/usage.
+#
+#   python -m app.usage backfill
+#
+# crud keeps the rollups current on every borrow, return and delete; backfill
+# fills in item-days that have no rollup rows from borrow_logs, e.g. history
+# recorded before the rollups existed. Rows already there are left alone, so
+# it is safe to run again. Run it from the backend directory, like the API.
+import argparse
+import time
+from .database import engine, SessionLocal, add_missing_columns
+from . import models, crud
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the borrow usage rollups")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("backfill", help="Add rollups for item-days missing from them")
+    parser.parse_args(argv)
+
+    models.BorrowDailyRollup.__table__.create(bind=engine, checkfirst=True)
+    add_missing_columns(engine, models.Base.metadata)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        rows = crud.backfill_borrow_usage(db)
+        print(f"Added {rows} rollup rows in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
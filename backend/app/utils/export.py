@@ -0,0 +1,59 @@
+import csv
+import enum
+import io
+import tempfile
+from datetime import datetime
+from typing import Iterable, Iterator, Sequence
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX export is optional
+    Workbook = None
+
+CSV_CHUNK_ROWS = 500
+FILE_CHUNK_SIZE = 64 * 1024
+
+def xlsx_available() -> bool:
+    return Workbook is not None
+
+def export_value(value, for_xlsx: bool = False):
+    if value is None:
+        return "" if not for_xlsx else None
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        # Excel has no time zones; CSV gets a plain sortable timestamp
+        value = value.replace(tzinfo=None)
+        return value if for_xlsx else value.strftime("%Y-%m-%d %H:%M")
+    return value
+
+def stream_csv(headers: Sequence[str], rows: Iterable) -> Iterator[str]:
+    """Yield CSV text a few hundred rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([export_value(value) for value in row])
+        if count % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def stream_xlsx(headers: Sequence[str], rows: Iterable, sheet_title: str = "Report") -> Iterator[bytes]:
+    """Write rows with openpyxl's write-only mode (rows go to temp files, not
+    memory), then stream the finished workbook"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    sheet.append(list(headers))
+    for row in rows:
+        sheet.append([export_value(value, for_xlsx=True) for value in row])
+
+    with tempfile.SpooledTemporaryFile(max_size=FILE_CHUNK_SIZE * 16) as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
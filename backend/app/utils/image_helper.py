@@ -1,7 +1,13 @@
+import asyncio
+import hashlib
 import os
-import uuid
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from fastapi import UploadFile, HTTPException
 from PIL import Image
+from typing import Optional
 import io
 
 UPLOAD_DIR = "uploads"
@@ -15,60 +21,271 @@ def allowed_file(filename: str) -> bool:
     file_extension = filename.rsplit(".", 1)[1].lower()
     return file_extension in ALLOWED_EXTENSIONS
 
+# Magic-byte signatures for the allowed image types
+IMAGE_SIGNATURES = {
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "gif": (b"GIF87a", b"GIF89a"),
+}
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Decoding/resizing/encoding runs in worker processes so a burst of uploads
+# neither blocks the event loop nor fights over the GIL. At most
+# IMAGE_QUEUE_LIMIT jobs (running + waiting) are accepted; beyond that uploads
+# get a 503 instead of piling up in memory.
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+IMAGE_QUEUE_LIMIT = int(os.getenv("IMAGE_QUEUE_LIMIT", str(IMAGE_WORKERS * 4)))
+
+image_pool = None
+image_jobs_in_flight = 0
+image_pool_lock = threading.Lock()
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Return the image type from the first bytes of a file, or None"""
+    for image_type, signatures in IMAGE_SIGNATURES.items():
+        if header.startswith(signatures):
+            return image_type
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+async def read_upload_limited(upload_file: UploadFile) -> bytes:
+    """Read an upload in chunks, rejecting it as soon as it exceeds MAX_FILE_SIZE
+    or its first bytes aren't an allowed image type"""
+    # Fast path when the size is already known from the multipart parser
+    if getattr(upload_file, "size", None) is not None and upload_file.size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail="File too large")
+    
+    buffer = io.BytesIO()
+    while True:
+        chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if buffer.tell() + len(chunk) > MAX_FILE_SIZE:
+            raise HTTPException(status_code=400, detail="File too large")
+        buffer.write(chunk)
+        # The first chunk is enough to tell whether this is an image at all
+        if buffer.tell() == len(chunk) and sniff_image_type(chunk) is None:
+            raise HTTPException(status_code=400, detail="Invalid image file: unrecognized file content")
+    
+    if buffer.tell() == 0:
+        raise HTTPException(status_code=400, detail="Empty file")
+    return buffer.getvalue()
+
+# Besides the stored upload (max 800px, original format) every image gets
+# {stem}_{width}.{ext} and {stem}_{width}.webp renditions so list pages and
+# avatars can fetch a small file instead of the full image. The stored file
+# doubles as the 800px original-format rendition.
+IMAGE_RENDITION_SIZES = (64, 200, 800)
+IMAGE_MAX_WIDTH = IMAGE_RENDITION_SIZES[-1]
+IMAGE_RENDITION_FORMATS = ("original", "webp")
+
+def resize_to_width(image, width: int):
+    """Scale an image down to the given width, never up"""
+    if image.width <= width:
+        return image
+    ratio = width / image.width
+    new_height = max(1, int(image.height * ratio))
+    return image.resize((width, new_height), Image.Resampling.LANCZOS)
+
+def save_image(image, file_path: str, file_extension: str) -> None:
+    # Write to a temp name and rename, so a reader (or a concurrent upload of
+    # the same content) never sees a half-written file
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    # Use appropriate format based on extension
+    if file_extension in ["jpg", "jpeg"]:
+        image.save(tmp_path, "JPEG", quality=85)
+    elif file_extension == "png":
+        image.save(tmp_path, "PNG", optimize=True)
+    elif file_extension == "gif":
+        image.save(tmp_path, "GIF")
+    elif file_extension == "webp":
+        image.save(tmp_path, "WEBP", quality=85)
+    else:
+        # Default to JPEG
+        image.save(tmp_path, "JPEG", quality=85)
+    os.replace(tmp_path, file_path)
+
+def rendition_path(file_path: str, width: int, file_extension: str) -> str:
+    stem = file_path.rsplit(".", 1)[0]
+    return f"{stem}_{width}.{file_extension}"
+
+def rendition_paths(file_path: str, file_extension: str) -> list:
+    """Files written for a stored upload besides the stored file itself"""
+    paths = []
+    for width in IMAGE_RENDITION_SIZES:
+        if width != IMAGE_MAX_WIDTH:
+            paths.append(rendition_path(file_path, width, file_extension))
+        paths.append(rendition_path(file_path, width, "webp"))
+    return paths
+
+def process_image(contents: bytes, file_path: str, file_extension: str) -> None:
+    """Verify, normalize and save an image with its renditions. Runs in a
+    worker process, so it must stay a module-level function"""
+    image = Image.open(io.BytesIO(contents))
+    
+    # Check if image is valid
+    image.verify()
+    
+    # Reopen the image for processing (verify() closes the image)
+    image = Image.open(io.BytesIO(contents))
+    
+    # Convert to RGB if necessary
+    if image.mode in ("RGBA", "P"):
+        image = image.convert("RGB")
+    
+    # Resize if too large (max 800px width)
+    image = resize_to_width(image, IMAGE_MAX_WIDTH)
+    
+    # Renditions are written first, so once the stored file exists they do too.
+    # The stored file itself is the full-width original-format rendition.
+    for width in IMAGE_RENDITION_SIZES:
+        rendition = resize_to_width(image, width)
+        if width != IMAGE_MAX_WIDTH:
+            save_image(rendition, rendition_path(file_path, width, file_extension), file_extension)
+        save_image(rendition, rendition_path(file_path, width, "webp"), "webp")
+    
+    # Save processed image
+    save_image(image, file_path, file_extension)
+
+@lru_cache(maxsize=4096)
+def has_renditions(relative_path: str) -> bool:
+    # Uploads are never rewritten in place, so the answer can be cached;
+    # images uploaded before renditions existed simply report False
+    path = os.path.join(UPLOAD_DIR, relative_path)
+    return os.path.exists(rendition_path(path, IMAGE_RENDITION_SIZES[0], "webp"))
+
+def upload_relative_path(value: Optional[str]) -> Optional[str]:
+    """Path under UPLOAD_DIR for a stored image value; items store it bare,
+    profile pictures as a /uploads/... URL"""
+    if not value:
+        return None
+    prefix = f"/{UPLOAD_DIR}/"
+    return value[len(prefix):] if value.startswith(prefix) else value
+
+def image_renditions(value: Optional[str]) -> Optional[dict]:
+    """Map each rendition width to its original-format and WebP files, in the
+    same form as the stored value (a bare filename for items, /uploads/...
+    for profile pictures). None when the image has no renditions."""
+    if not value or "." not in value:
+        return None
+    if not has_renditions(upload_relative_path(value)):
+        return None
+    
+    file_extension = value.rsplit(".", 1)[1]
+    return {
+        str(width): {
+            "original": value if width == IMAGE_MAX_WIDTH else rendition_path(value, width, file_extension),
+            "webp": rendition_path(value, width, "webp"),
+        }
+        for width in IMAGE_RENDITION_SIZES
+    }
+
+def select_rendition(value: Optional[str], renditions: Optional[dict], size: Optional[int], image_format: Optional[str] = None) -> Optional[str]:
+    """Pick the smallest rendition at least `size` wide, falling back to the
+    stored value when there are no renditions"""
+    if not renditions or size is None:
+        return value
+    width = next((w for w in IMAGE_RENDITION_SIZES if w >= size), IMAGE_RENDITION_SIZES[-1])
+    return renditions[str(width)][image_format or "original"]
+
+def apply_image_size(objects, field: str, renditions_field: str, size: Optional[int], image_format: Optional[str] = None):
+    """Point `field` of validated response models at the requested rendition"""
+    if size is None and image_format is None:
+        return objects
+    for obj in objects:
+        renditions = getattr(obj, renditions_field)
+        setattr(obj, field, select_rendition(getattr(obj, field), renditions, size or IMAGE_MAX_WIDTH, image_format))
+    return objects
+
+def get_image_pool() -> ProcessPoolExecutor:
+    global image_pool
+    with image_pool_lock:
+        if image_pool is None:
+            image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return image_pool
+
+def shutdown_image_pool(wait: bool = False):
+    global image_pool
+    with image_pool_lock:
+        pool, image_pool = image_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+async def run_image_job(func, *args):
+    """Run an image job in the process pool, or 503 when the queue is full"""
+    global image_jobs_in_flight
+    if image_jobs_in_flight >= IMAGE_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=503,
+            detail="Image processing is busy, please try again shortly",
+            headers={"Retry-After": "1"}
+        )
+    
+    image_jobs_in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_image_pool(), func, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge image); start fresh next time
+        shutdown_image_pool()
+        raise HTTPException(status_code=503, detail="Image processing failed, please try again")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image file: {str(e)}")
+    finally:
+        image_jobs_in_flight -= 1
+
+# Uploads are content addressed: stored as {h[0:2]}/{h[2:4]}/{h}.{ext} where h
+# is the SHA-256 of the uploaded bytes, so identical uploads share one set of
+# files and are only processed once
+pending_image_paths = {}
+
+def content_addressed_path(contents: bytes, file_extension: str) -> str:
+    digest = hashlib.sha256(contents).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.{file_extension}"
+
+async def store_image(contents: bytes, relative_path: str, file_extension: str) -> None:
+    file_path = os.path.join(UPLOAD_DIR, relative_path)
+    # The stored file is written last, so if it exists the renditions do too
+    if os.path.exists(file_path):
+        # Bump the mtimes so an orphan sweep running now treats the upload as
+        # fresh. The sweep goes file by file, so the renditions need it too.
+        try:
+            for path in rendition_paths(file_path, file_extension) + [file_path]:
+                os.utime(path)
+            return
+        except FileNotFoundError:
+            # Swept in the meantime, or stored before renditions existed
+            pass
+    
+    # Concurrent uploads of the same content wait on one job
+    job = pending_image_paths.get(file_path)
+    if job is None:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        job = asyncio.ensure_future(run_image_job(process_image, contents, file_path, file_extension))
+        pending_image_paths[file_path] = job
+        job.add_done_callback(lambda _: pending_image_paths.pop(file_path, None))
+    await asyncio.shield(job)
+
 async def save_upload_file(upload_file: UploadFile) -> str:
     # Check if file has a name
     if not upload_file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
     
-    # Check file size
-    contents = await upload_file.read()
-    if len(contents) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large")
-    
-    # Check file type
+    # Check file type before reading anything
     if not allowed_file(upload_file.filename):
         raise HTTPException(status_code=400, detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}")
     
-    # Generate unique filename
-    file_extension = upload_file.filename.rsplit(".", 1)[1].lower()
-    filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
+    # Read with the size cap and content sniffing enforced chunk by chunk
+    contents = await read_upload_limited(upload_file)
     
-    # Validate and process image
-    try:
-        image = Image.open(io.BytesIO(contents))
-        
-        # Check if image is valid
-        image.verify()
-        
-        # Reopen the image for processing (verify() closes the image)
-        image = Image.open(io.BytesIO(contents))
-        
-        # Convert to RGB if necessary
-        if image.mode in ("RGBA", "P"):
-            image = image.convert("RGB")
-        
-        # Resize if too large (max 800px width)
-        if image.width > 800:
-            ratio = 800 / image.width
-            new_height = int(image.height * ratio)
-            image = image.resize((800, new_height), Image.Resampling.LANCZOS)
-        
-        # Save processed image
-        # Use appropriate format based on extension
-        if file_extension in ["jpg", "jpeg"]:
-            image.save(file_path, "JPEG", quality=85)
-        elif file_extension == "png":
-            image.save(file_path, "PNG", optimize=True)
-        elif file_extension == "gif":
-            image.save(file_path, "GIF")
-        elif file_extension == "webp":
-            image.save(file_path, "WEBP", quality=85)
-        else:
-            # Default to JPEG
-            image.save(file_path, "JPEG", quality=85)
-        
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid image file: {str(e)}")
+    # Trust the content over the name: a PNG called photo.jpg is saved as PNG.
+    # The extension only depends on the content so equal bytes map to one path.
+    sniffed_type = sniff_image_type(contents)
+    file_extension = "jpg" if sniffed_type == "jpeg" else sniffed_type
+    relative_path = content_addressed_path(contents, file_extension)
+    
+    # Validate and process image off the event loop, unless already stored
+    await store_image(contents, relative_path, file_extension)
     
-    return filename
\ No newline at end of file
+    return relative_path
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+IMPORT_EXTENSIONS = {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl"}
+
+# (row number in the file, field values, error)
+ImportRow = Tuple[int, Optional[dict], Optional[str]]
+
+def import_format(filename: Optional[str]) -> Optional[str]:
+    if not filename or "." not in filename:
+        return None
+    return IMPORT_EXTENSIONS.get(filename.rsplit(".", 1)[1].lower())
+
+def clean_row(data: dict) -> dict:
+    # Blank cells fall back to the field defaults rather than failing validation
+    cleaned = {}
+    for key, value in data.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == "":
+                continue
+        if value is None:
+            continue
+        cleaned[key.strip().lower()] = value
+    return cleaned
+
+def iter_csv_rows(text: io.TextIOBase) -> Iterator[ImportRow]:
+    reader = csv.DictReader(text)
+    for data in reader:
+        if None in data:
+            yield reader.line_num, None, "Too many columns"
+            continue
+        if not any(value and value.strip() for value in data.values()):
+            continue
+        yield reader.line_num, clean_row(data), None
+
+def iter_jsonl_rows(text: io.TextIOBase) -> Iterator[ImportRow]:
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, clean_row(data), None
+
+def iter_import_rows(file: BinaryIO, file_format: str) -> Iterator[ImportRow]:
+    """Parse an uploaded CSV (with a header row) or JSONL file one row at a
+    time, so the whole file is never held in memory"""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    parse = iter_csv_rows if file_format == "csv" else iter_jsonl_rows
+    rows = parse(text)
+    row_number = 0
+    try:
+        while True:
+            try:
+                row_number, data, error = next(rows)
+            except StopIteration:
+                return
+            except (UnicodeDecodeError, csv.Error) as e:
+                # The rest of the file can't be read reliably
+                yield row_number + 1, None, f"Unreadable file content: {e}"
+                return
+            yield row_number, data, error
+    finally:
+        # Leave the upload's own file open for the framework to close
+        text.detach()
@@ -0,0 +1,136 @@
+import os
+import re
+import typing
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# Uploaded files are never modified in place (new content gets a new name), so
+# browsers may keep them for a year without revalidating
+UPLOADS_CACHE_MAX_AGE = int(os.getenv("UPLOADS_CACHE_MAX_AGE", str(365 * 24 * 3600)))
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def strong_etag(stat_result: os.stat_result) -> str:
+    # Files are only ever replaced by rename, which gives them a new inode, so
+    # inode + size identifies the bytes; mtime is left out because the upload
+    # store touches files it deduplicates against
+    return f'"{stat_result.st_ino:x}-{stat_result.st_size:x}"'
+
+
+def parse_range(range_header: str, size: int) -> typing.Optional[typing.Tuple[int, int]]:
+    """Parse a single "bytes=start-end" range into inclusive offsets.
+
+    Returns None for headers we serve in full (multiple ranges or malformed
+    values) and raises ValueError when the range cannot be satisfied."""
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    start, end = match.groups()
+    if start == "":
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = size - 1 if end == "" else min(int(end), size - 1)
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+class FileRangeResponse(FileResponse):
+    """FileResponse that sends only bytes [start, end] of the file"""
+
+    def __init__(self, path, start: int, end: int, **kwargs):
+        super().__init__(path, status_code=206, **kwargs)
+        self.start = start
+        self.end = end
+        size = self.stat_result.st_size
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = self.end - self.start + 1
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; end the body anyway
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content that never changes under the same URL.
+
+    Adds a long-lived immutable Cache-Control, strong ETags that survive
+    mtime changes, RFC 9110 conditional handling and single-range requests."""
+
+    def __init__(self, *args, max_age: int = UPLOADS_CACHE_MAX_AGE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = f"public, max-age={max_age}, immutable"
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        method = scope["method"]
+        request_headers = Headers(scope=scope)
+        headers = {
+            "etag": strong_etag(stat_result),
+            "cache-control": self.cache_control,
+            "accept-ranges": "bytes",
+        }
+
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result, headers=headers, method=method
+        )
+        if status_code != 200:
+            return response
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        range_header = request_headers.get("range")
+        if range_header and method in ("GET", "HEAD"):
+            # If-Range: only honour the range if the client's copy is current
+            if_range = request_headers.get("if-range")
+            if if_range is None or if_range == headers["etag"]:
+                try:
+                    byte_range = parse_range(range_header, stat_result.st_size)
+                except ValueError:
+                    return Response(
+                        status_code=416,
+                        headers={"content-range": f"bytes */{stat_result.st_size}", **headers},
+                    )
+                if byte_range is not None:
+                    return FileRangeResponse(
+                        full_path, *byte_range, stat_result=stat_result, headers=headers, method=method
+                    )
+        return response
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        # If-None-Match wins over If-Modified-Since when both are sent
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            etag = response_headers["etag"]
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            # Weak comparison, as required for If-None-Match
+            return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+        return super().is_not_modified(response_headers, request_headers)
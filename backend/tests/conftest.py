@@ -0,0 +1,114 @@
+#tests/conftest.py
+# Runs the app against a throwaway database: database.py opens
+# ./chemlab_inventory.db and uploads go to ./uploads, so the working
+# directory is switched before anything from app is imported.
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(tempfile.mkdtemp(prefix="chemlab-tests-"))
+os.environ.setdefault("RUN_SCHEDULER", "false")
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal, engine, async_engine
+from app import crud, schemas
+
+
+@pytest.fixture(scope="session")
+def client():
+    # Entering the client runs the startup event: tables, triggers, default users
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    response = client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def unique(prefix):
+    return f"{prefix}-{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture
+def make_user(db):
+    def _make_user(role="viewer"):
+        name = unique("user")
+        return crud.create_user(db, schemas.UserCreate(
+            username=name, email=f"{name}@example.com", full_name=name, password="secret123", role=role
+        ))
+    return _make_user
+
+
+@pytest.fixture
+def make_category(db):
+    def _make_category():
+        return crud.create_category(db, schemas.CategoryCreate(name=unique("category")))
+    return _make_category
+
+
+@pytest.fixture
+def make_item(db, make_user, make_category):
+    def _make_item(quantity=10, category_id=None, created_by=None, **fields):
+        return crud.create_item(db, schemas.ItemCreate(
+            name=unique("item"),
+            category_id=category_id or make_category().id,
+            quantity=quantity,
+            created_by=created_by or make_user("admin").id,
+            **fields
+        ))
+    return _make_item
+
+
+@pytest.fixture
+def borrow(db, make_user):
+    def _borrow(item, user=None, quantity=1, due_in_days=7):
+        user = user or make_user()
+        return crud.create_borrow_log(db, schemas.BorrowLogCreate(
+            item_id=item.id,
+            user_id=user.id,
+            admin_id=item.created_by,
+            quantity_borrowed=quantity,
+            expected_return_date=datetime.now() + timedelta(days=due_in_days),
+        ))
+    return _borrow
+
+
+@pytest.fixture
+def count_statements():
+    """count_statements(run) calls run() and returns the SQL statements it sent"""
+    def _count_statements(run):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        # With USE_ASYNC_DB the read endpoints go through the aiosqlite engine
+        engines = [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+        for target in engines:
+            event.listen(target, "before_cursor_execute", before_cursor_execute)
+        try:
+            run()
+        finally:
+            for target in engines:
+                event.remove(target, "before_cursor_execute", before_cursor_execute)
+        return statements
+    return _count_statements
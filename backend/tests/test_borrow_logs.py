@@ -0,0 +1,76 @@
+#tests/test_borrow_logs.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app import crud, models, schemas
+from app.database import SessionLocal
+
+
+def test_overdue_sweep_keeps_logs_out_and_overdue(db, make_item, make_user, borrow):
+    user = make_user()
+    overdue = borrow(make_item(), user=user, due_in_days=-1)
+    borrow(make_item(), user=user, due_in_days=7)
+
+    crud.update_overdue_borrows(db)
+    db.refresh(overdue)
+    assert overdue.status == models.BorrowStatus.OVERDUE
+
+    stats = crud.get_dashboard_stats(db, user_id=user.id, user_role="viewer")
+    assert stats["total_borrowed_items"] == 2
+    assert stats["overdue_borrows"] == 1
+
+    listed = crud.get_borrow_logs(db, user_id=user.id, overdue_only=True)
+    assert [log.id for log in listed] == [overdue.id]
+
+
+def test_batch_borrow_statements_do_not_grow_with_lines(client, admin_headers, make_item, make_user, count_statements):
+    item = make_item(quantity=100)
+    user = make_user()
+    due = (datetime.now() + timedelta(days=7)).isoformat()
+
+    def post_batch(lines):
+        response = client.post("/api/borrowed/batch", headers=admin_headers, json={
+            "lines": [{"item_id": item.id, "user_id": user.id, "quantity_borrowed": 1}] * lines,
+            "expected_return_date": due,
+        })
+        assert response.status_code == 200
+        assert len(response.json()["borrow_logs"]) == lines
+
+    post_batch(1)  # warms the auth cache
+    one = count_statements(lambda: post_batch(1))
+    thirty = count_statements(lambda: post_batch(30))
+
+    assert len(thirty) == len(one)
+    assert sum(statement.startswith("INSERT INTO borrow_logs") for statement in thirty) == 1
+
+
+def test_concurrent_borrows_never_oversell(db, make_item, make_user):
+    item = make_item(quantity=10)
+    user = make_user()
+    start = threading.Barrier(16)
+
+    def borrow_one(_):
+        session = SessionLocal()
+        try:
+            start.wait()
+            crud.create_borrow_log(session, schemas.BorrowLogCreate(
+                item_id=item.id,
+                user_id=user.id,
+                admin_id=item.created_by,
+                quantity_borrowed=1,
+                expected_return_date=datetime.now() + timedelta(days=7),
+            ))
+            return True
+        except ValueError:
+            return False
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(borrow_one, range(16)))
+
+    assert results.count(True) == 10
+    db.refresh(item)
+    assert item.available_quantity == 0
+    assert len(crud.get_borrow_logs(db, item_id=item.id)) == 10
@@ -0,0 +1,41 @@
+#tests/test_items.py
+import uuid
+from datetime import datetime, timedelta
+
+from app import crud, schemas
+
+
+def test_item_page_queries_do_not_grow_with_page_size(client, admin_headers, make_item, make_user, count_statements):
+    location = f"shelf-{uuid.uuid4().hex[:8]}"
+    creators = [make_user("admin").id, make_user("admin").id]
+    for index in range(50):
+        make_item(storage_location=location, created_by=creators[index % 2])
+
+    def read_page(limit):
+        response = client.get("/api/items/", headers=admin_headers, params={"storage_location": location, "limit": limit})
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+
+    one = count_statements(lambda: read_page(1))
+    fifty = count_statements(lambda: read_page(50))
+    assert one
+    assert len(fifty) == len(one)
+
+
+def test_expiry_sweep_restores_condition_when_expiry_is_extended(db, make_item):
+    item = make_item(condition="damaged", expiry_date=datetime.now() - timedelta(days=1))
+    expired_by_hand = make_item(condition="expired", expiry_date=datetime.now() + timedelta(days=30))
+
+    crud.update_expired_items(db)
+    db.refresh(item)
+    assert item.condition == "expired"
+
+    # The item form sends the current condition back along with the new date
+    crud.update_item(db, item.id, schemas.ItemUpdate(
+        condition="expired", expiry_date=datetime.now() + timedelta(days=30)
+    ))
+    crud.update_expired_items(db)
+    db.refresh(item)
+    db.refresh(expired_by_hand)
+    assert item.condition == "damaged"
+    assert expired_by_hand.condition == "expired"
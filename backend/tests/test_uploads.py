@@ -0,0 +1,36 @@
+#tests/test_uploads.py
+import asyncio
+import io
+import os
+import random
+import time
+
+from PIL import Image
+
+from app import upload_store
+from app.database import engine
+from app.utils import image_helper
+
+
+def png_bytes():
+    color = tuple(random.randrange(256) for _ in range(3))
+    buffer = io.BytesIO()
+    Image.new("RGB", (900, 600), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_reupload_keeps_renditions_through_the_orphan_sweep(client):
+    contents = png_bytes()
+    relative_path = image_helper.content_addressed_path(contents, "png")
+    file_path = os.path.join(image_helper.UPLOAD_DIR, relative_path)
+    asyncio.run(image_helper.store_image(contents, relative_path, "png"))
+    files = image_helper.rendition_paths(file_path, "png") + [file_path]
+
+    # Stored two days ago and never referenced, then uploaded again
+    two_days_ago = time.time() - 2 * 24 * 3600
+    for path in files:
+        os.utime(path, (two_days_ago, two_days_ago))
+    asyncio.run(image_helper.store_image(contents, relative_path, "png"))
+
+    upload_store.sweep_orphaned_uploads(engine)
+    assert [path for path in files if not os.path.exists(path)] == []
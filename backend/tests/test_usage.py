@@ -0,0 +1,30 @@
+#tests/test_usage.py
+from sqlalchemy import select
+
+from app import crud, models, schemas
+
+
+def rollup_rows(db, item_id):
+    rollup = models.BorrowDailyRollup
+    return {
+        row.category_id: (row.borrowed_count, row.borrowed_quantity, row.returned_count, row.returned_quantity)
+        for row in db.scalars(select(rollup).where(rollup.item_id == item_id))
+    }
+
+
+def test_deleting_a_log_after_a_category_change_undoes_its_usage(db, make_item, make_category, borrow):
+    item = make_item()
+    old_category = item.category_id
+    returned = borrow(item, quantity=2)
+    still_out = borrow(item, quantity=3)
+    crud.update_borrow_log(db, returned.id, schemas.BorrowLogUpdate(status="returned"))
+    assert rollup_rows(db, item.id) == {old_category: (2, 5, 1, 2)}
+
+    new_category = make_category().id
+    crud.update_item(db, item.id, schemas.ItemUpdate(category_id=new_category))
+    crud.delete_borrow_log(db, returned.id)
+    crud.delete_borrow_log(db, still_out.id)
+
+    rows = rollup_rows(db, item.id)
+    assert rows[old_category] == (0, 0, 0, 0)
+    assert new_category not in rows
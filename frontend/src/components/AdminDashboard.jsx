@@ -40,6 +40,13 @@ function AdminDashboard({ stats, user }) {
       color: "danger",
       description: "Items past expiry date"
     },
+    {
+      value: stats.expiring_soon_items,
+      label: "Expiring Soon",
+      icon: Clock,
+      color: "warning",
+      description: "Expiring within 30 days"
+    },
     {
       value: stats.total_borrowed_items,
       label: "Borrowed Items",
@@ -84,7 +84,7 @@ function Header({ onMenuToggle, isSidebarCollapsed }) {
               <div className="user-avatar">
                 {user?.profile_picture ? (
                   <img 
-                    src={`http://localhost:8000${user.profile_picture}`} 
+                    src={`http://localhost:8000${user.profile_picture_renditions?.['64']?.webp || user.profile_picture}`} 
                     alt="Profile" 
                     className="profile-image"
                   />
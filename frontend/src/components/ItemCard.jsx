@@ -42,7 +42,7 @@ function ItemCard({
           <div className="item-image-wrapper">
             {item.image_url ? (
               <img 
-                src={`http://localhost:8000/uploads/${item.image_url}`} 
+                src={`http://localhost:8000/uploads/${item.image_renditions?.['200']?.webp || item.image_url}`} 
                 alt={item.name}
                 className="item-image"
                 onError={(e) => {
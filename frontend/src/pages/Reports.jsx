@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import { Download, Filter, Calendar, BarChart3, Package, AlertTriangle, Clock, TrendingUp } from 'lucide-react'
-import { dashboardService, itemService, borrowService } from '../services/api'
+import { dashboardService, itemService, borrowService, reportService } from '../services/api'
 import { useAuth } from '../services/AuthContext'
 
 function Reports() {
@@ -40,70 +40,29 @@ function Reports() {
     }
   }
 
-  const generateReport = (type) => {
-    let csvContent = []
-    let filename = ''
-
-    switch (type) {
-      case 'inventory':
-        csvContent = [
-          ['Name', 'Category', 'Quantity', 'Available', 'Unit', 'Location', 'Condition', 'Status'],
-          ...lowStockItems.map(item => [
-            item.name,
-            item.category?.name,
-            item.quantity,
-            item.available_quantity,
-            item.unit,
-            item.storage_location,
-            item.condition,
-            item.available_quantity <= item.min_stock_level ? 'LOW STOCK' : 'OK'
-          ])
-        ]
-        filename = 'inventory-report.csv'
-        break
-
-      case 'expired':
-        csvContent = [
-          ['Name', 'Category', 'Quantity', 'Unit', 'Location', 'Expiry Date'],
-          ...expiredItems.map(item => [
-            item.name,
-            item.category?.name,
-            item.quantity,
-            item.unit,
-            item.storage_location,
-            new Date(item.expiry_date).toLocaleDateString()
-          ])
-        ]
-        filename = 'expired-items-report.csv'
-        break
-
-      case 'borrowed':
-        csvContent = [
-          ['Item', 'User', 'Quantity', 'Borrow Date', 'Expected Return', 'Status'],
-          ...overdueBorrows.map(log => [
-            log.item?.name,
-            log.user?.full_name,
-            log.quantity_borrowed,
-            new Date(log.borrow_date).toLocaleDateString(),
-            new Date(log.expected_return_date).toLocaleDateString(),
-            log.status
-          ])
-        ]
-        filename = 'borrowed-items-report.csv'
-        break
-
-      default:
-        return
+  const generateReport = async (type) => {
+    // The server streams every matching row, so exports are no longer capped
+    // at the page size of the lists shown here
+    const dateParams = { start_date: dateRange.start, end_date: dateRange.end }
+    const reports = {
+      inventory: { params: { low_stock: true }, filename: 'inventory-report.csv' },
+      expired: { params: dateParams, filename: 'expired-items-report.csv' },
+      borrowed: { params: { overdue_only: true, ...dateParams }, filename: 'borrowed-items-report.csv' }
     }
+    const report = reports[type]
+    if (!report) return
 
-    const csvString = csvContent.map(row => row.join(',')).join('\n')
-    const blob = new Blob([csvString], { type: 'text/csv' })
-    const url = URL.createObjectURL(blob)
-    const link = document.createElement('a')
-    link.href = url
-    link.download = filename
-    link.click()
-    URL.revokeObjectURL(url)
+    try {
+      const blob = await reportService.download(type, report.params)
+      const url = URL.createObjectURL(blob)
+      const link = document.createElement('a')
+      link.href = url
+      link.download = report.filename
+      link.click()
+      URL.revokeObjectURL(url)
+    } catch (error) {
+      console.error('Error exporting report:', error)
+    }
   }
 
   if (loading) {
@@ -285,7 +285,7 @@ function Users() {
                         <div className="user-avatar-wrapper">
                           {user.profile_picture ? (
                             <img 
-                              src={`http://localhost:8000${user.profile_picture}`} 
+                              src={`http://localhost:8000${user.profile_picture_renditions?.['64']?.webp || user.profile_picture}`} 
                               alt={user.full_name}
                               className="user-avatar-image"
                             />
@@ -122,6 +122,12 @@ export const dashboardService = {
     api.get('/users/dashboard/stats').then(res => res.data),
 }
 
+// Report exports, streamed as CSV (or XLSX) by the server
+export const reportService = {
+  download: (type, params = {}) => 
+    api.get(`/reports/${type}`, { params, responseType: 'blob' }).then(res => res.data),
+}
+
 // Profile services
 export const profileService = {
   getMyProfile: () => 